@@ -0,0 +1,96 @@
+import struct
+import pytest
+
+from zeroundub.zero.text.parser import InGameMessageParser, InGameMessageTable
+from zeroundub.zero.text.tables import encoding_eu
+
+
+def encode_text(text: str):
+    return b"".join(encoding_eu[ch] for ch in text) + b"\xff"
+
+
+def build_tables(entries: list, offset=0):
+    # a table is the offsets of its entries followed by the entries themselves, as the game files lay them out
+    blob = bytearray(len(entries) * 4)
+    offsets = []
+
+    for entry in entries:
+        offsets.append(offset + len(blob))
+        blob += build_tables(entry, offset + len(blob)) if isinstance(entry, list) else encode_text(entry)
+
+    struct.pack_into(f"<{len(offsets)}I", blob, 0, *offsets)
+    return bytes(blob)
+
+
+MESSAGES = [
+    [
+        ["hello there", "door is locked"],
+        ["something moved", "camera obscura", "mind the stairs"],
+    ],
+    ["look closer", "wrong key"],
+    [
+        ["nothing happens"],
+        ["follow me", "in the dark"],
+        ["please help"],
+    ],
+]
+
+
+def walk(msg_table: InGameMessageTable, depth=0):
+    # (depth, kind, number, offset) of every table and message, depth first
+    entries = [(depth, "table", msg_table.number, msg_table.offset)]
+
+    for table in msg_table.tables:
+        entries.extend(walk(table, depth + 1))
+
+    for message in msg_table.messages:
+        entries.append((depth + 1, "message", message.number, message.offset))
+
+    return entries
+
+
+# order and offsets produced by the recursive parser
+EXPECTED_ENTRIES = [
+    (0, "table", 0, 0),
+    (1, "table", 0, 12),
+    (2, "table", 0, 20),
+    (3, "message", 0, 28),
+    (3, "message", 1, 40),
+    (2, "table", 1, 55),
+    (3, "message", 0, 67),
+    (3, "message", 1, 83),
+    (3, "message", 2, 98),
+    (1, "table", 1, 114),
+    (2, "message", 0, 122),
+    (2, "message", 1, 134),
+    (1, "table", 2, 144),
+    (2, "table", 0, 156),
+    (3, "message", 0, 160),
+    (2, "table", 1, 176),
+    (3, "message", 0, 184),
+    (3, "message", 1, 194),
+    (2, "table", 2, 206),
+    (3, "message", 0, 210),
+]
+
+
+def test_parse_obj_tables_order_and_offsets():
+    blob = build_tables(MESSAGES)
+    parser = InGameMessageParser(blob)
+
+    assert walk(parser.msg_tables) == EXPECTED_ENTRIES
+    assert [message.message for message in parser[0][1].messages] == MESSAGES[0][1]
+    assert [message.message for message in parser[1].messages] == MESSAGES[1]
+
+
+def test_parse_obj_tables_mixed_table():
+    # a table holds either tables or messages
+    blob = build_tables([[["hello there"], "wrong key"]])
+
+    with pytest.raises(RuntimeError):
+        InGameMessageParser(blob)
+
+
+def test_parse_obj_tables_round_trip():
+    blob = build_tables(MESSAGES)
+    assert InGameMessageParser(blob).encode() == blob
@@ -0,0 +1,105 @@
+import io
+import random
+import struct
+import hashlib
+import numpy as np
+
+from zeroundub.zero.tim2 import (
+    defilter_palette,
+    first_row,
+    idx_num,
+    idx_start,
+    palette_filter_maps,
+    patch_pl_mtop,
+    refilter_palette,
+)
+
+
+WIDTH = 256
+HEIGHT = 112
+
+# digests of the patched images as output by the original implementation (scipy cdist palettization, python sorts)
+PL_MTOP_FILTERED_SHA256 = "af37333d7fc0838f2f8d56f31054e14d2b208abee1d7afa2e1fcf4f48639d8e5"
+PL_MTOP_LINEAR_SHA256 = "f6bf718cf1e2021d2e81c89193bc3b5b6f40db1138c3d86cf099fb4cf4f90e15"
+
+
+def make_tim2(data: bytes, palette: bytes, linear_palette: bool):
+    header = struct.pack("<4sHH8x", b"TIM2", 4, 1)
+    image_header = struct.pack(
+        "<IIIHHBBBBHHQQII",
+        48 + len(data) + len(palette),  # total length
+        len(palette),  # palette length
+        len(data),  # image data length
+        48,  # header length
+        len(palette) // 4,  # color entries
+        0,  # image format
+        1,  # mipmap count
+        0x03 | (0x80 if linear_palette else 0),  # clut format
+        5,  # 8 bpp
+        WIDTH,
+        HEIGHT,
+        0,
+        0,
+        0,
+        0,
+    )
+    return header + image_header + data + palette
+
+
+def make_pl_mtop_pair(seed: int, linear_palette: bool):
+    rng = random.Random(seed)
+
+    # 512 different colors: the first 256 for the european palette, the others for the japanese one
+    colors = rng.sample(range(2**32), 512)
+    palette_eu = b"".join(struct.pack("<I", color) for color in colors[:256])
+    palette_jp = b"".join(struct.pack("<I", color) for color in colors[256:])
+
+    # the european image uses its first 200 colors outside the patched area and the others only in it, so that the
+    # patch leaves room for japanese colors in the new palette
+    data_eu = bytearray(rng.randrange(200) for _ in range(WIDTH * HEIGHT))
+    data_jp = bytes(rng.randrange(256) for _ in range(WIDTH * HEIGHT))
+
+    for i, (start, num) in enumerate(zip(idx_start, idx_num)):
+        row = (first_row + i) * WIDTH
+        for column in range(start, start + num + 1):
+            data_eu[row + column] = rng.randrange(200, 256)
+
+    return (
+        make_tim2(bytes(data_eu), palette_eu, linear_palette),
+        make_tim2(data_jp, palette_jp, linear_palette),
+    )
+
+
+def test_patch_pl_mtop_filtered_palette():
+    tim2_eu, tim2_jp = make_pl_mtop_pair(1, linear_palette=False)
+    patched = patch_pl_mtop(io.BytesIO(tim2_eu), io.BytesIO(tim2_jp))
+
+    assert len(patched) == len(tim2_eu)
+    assert hashlib.sha256(patched).hexdigest() == PL_MTOP_FILTERED_SHA256
+
+
+def test_patch_pl_mtop_linear_palette():
+    tim2_eu, tim2_jp = make_pl_mtop_pair(2, linear_palette=True)
+    patched = patch_pl_mtop(io.BytesIO(tim2_eu), io.BytesIO(tim2_jp))
+
+    assert len(patched) == len(tim2_eu)
+    assert hashlib.sha256(patched).hexdigest() == PL_MTOP_LINEAR_SHA256
+
+
+def test_palette_filter_round_trip():
+    defilter_map, refilter_map = palette_filter_maps(256)
+
+    # the second and the third block of 8 colors of every 32 are swapped
+    expected = [*range(0, 8), *range(16, 24), *range(8, 16), *range(24, 32)]
+    assert list(defilter_map[:32]) == expected
+    assert list(defilter_map[32:64]) == [32 + i for i in expected]
+    assert sorted(defilter_map) == list(range(256))
+    assert [defilter_map[i] for i in refilter_map] == list(range(256))
+
+    rng = random.Random(3)
+    palette = [tuple(rng.randrange(256) for _ in range(4)) for _ in range(256)]
+
+    defiltered, defilter_order = defilter_palette(palette)
+    assert np.array_equal(np.asarray(defiltered)[:32], np.asarray([palette[j] for j in expected]))
+    assert np.array_equal(np.asarray(refilter_palette(defiltered, defilter_order)), np.asarray(palette))
+    assert np.array_equal(np.asarray(refilter_palette(defiltered)), np.asarray(palette))
@@ -5,14 +5,6 @@ import argparse
 from dataclasses import dataclass
 
 from ..error import AbstractProgressError
-from ..progress import Progress
-from ..utils import copy_file
-from ...zero.iso import (
-    check_iso_hashes,
-    replace_movies_in_iso_inplace,
-    patch_elf_inplace,
-    merge_iso_img_bd_contents,
-)
 
 
 @dataclass
@@ -64,6 +56,13 @@ class ProgressErrorGamePatch(AbstractProgressError):
     suggestion = "Please report this issue on the GitHub page"
 
 
+def _stat_or_none(path: str) -> "os.stat_result | None":
+    try:
+        return os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+
 def main():
     parser = argparse.ArgumentParser(description="Project Zero Undub Tool")
 
@@ -124,7 +123,9 @@ def main():
 
     args = parser.parse_args()
 
-    if os.path.exists(args.iso_out):
+    iso_eu_stat, iso_jp_stat, iso_out_stat = (_stat_or_none(path) for path in (args.iso_eu, args.iso_jp, args.iso_out))
+
+    if iso_out_stat is not None:
         print()
         print("  Output ISO already exists. This program will not overwrite any")
         print("  existing file. You should specify a new path for the output.")
@@ -133,23 +134,47 @@ def main():
 
     args.force_16_9_movies &= args.force_16_9_game
 
-    if not os.path.exists(args.iso_eu) or not os.path.exists(args.iso_jp):
+    if iso_eu_stat is None or iso_jp_stat is None:
         ProgressErrorFileExist.print()
         sys.exit(1)
 
+    # pylint: disable=import-outside-toplevel
+    # heavy modules (tqdm, pycdlib, numpy) are only loaded once the arguments have been validated
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ..progress import Progress
+    from ..utils import copy_file
+    from ...zero.iso import (
+        check_iso_hashes,
+        replace_movies_in_iso_inplace,
+        patch_elf_inplace,
+        merge_iso_img_bd_contents,
+        get_img_bd_extent,
+    )
+
     print()
     print("  Welcome to the Project Zero undubbing process (by karas84)!")
     print("  Please wait while your game is being undubbed...")
     print()
 
-    with Progress("Checking EU ISO", ProgressErrorCRCEU) as pbar:
-        check_iso_hashes(args.iso_eu, lang="EU", callback=pbar)
-
-    with Progress("Checking JP ISO", ProgressErrorCRCJP) as pbar:
-        check_iso_hashes(args.iso_jp, lang="JP", callback=pbar)
+    # both isos are checked at the same time, each one with its own progress bar. the eu one is the inner context:
+    # it exits first, so that its error is the one reported when both checks fail
+    with Progress("Checking JP ISO", ProgressErrorCRCJP, position=1) as pbar_jp, Progress(
+        "Checking EU ISO", ProgressErrorCRCEU, position=0
+    ) as pbar_eu:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            checks = {
+                executor.submit(check_iso_hashes, args.iso_eu, lang="EU", callback=pbar_eu): pbar_eu,
+                executor.submit(check_iso_hashes, args.iso_jp, lang="JP", callback=pbar_jp): pbar_jp,
+            }
+
+        for future, pbar in checks.items():
+            if future.exception() is not None:
+                pbar.fail()
 
     with Progress("Copying ISO", ProgressErrorISOCopy) as pbar:
-        copy_file(args.iso_eu, args.iso_out, pbar)
+        # IMG_BD.BIN is entirely rewritten when patching the contents, so it is not copied at all
+        copy_file(args.iso_eu, args.iso_out, pbar, src_size=iso_eu_stat.st_size, skip=[get_img_bd_extent(args.iso_eu)])
 
     with Progress("Patching Movies", ProgressErrorMoviePatch) as pbar:
         replace_movies_in_iso_inplace(args.iso_jp, args.iso_out, pbar)
@@ -177,6 +202,7 @@ def main():
             replace_models=args.replace_models,
             replace_sfx=True,
             callback=pbar,
+            img_bd_copied=False,
         )
 
     print()
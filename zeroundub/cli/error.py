@@ -1,3 +1,5 @@
+import io
+import os
 import sys
 from abc import ABC
 from dataclasses import dataclass
@@ -9,15 +11,28 @@ class AbstractProgressError(ABC):
     explanation: str
     suggestion: str
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # messages are class constants, render them only once
+        cls._rendered = (
+            "\n"
+            + "  " + cls.error_msg.replace("Error", "\x1b[1;31mError\x1b[0m") + ".\n"
+            + "  " + f"\x1b[4m{cls.explanation}\x1b[0m" + ".\n"
+            + "  " + cls.suggestion + ".\n"
+            + "\n"
+        )  # fmt: skip
+
     def __post_init__(self):
         raise RuntimeError("Cannot instantiate ProgressError")
 
     @classmethod
     def print(cls, file=sys.stdout):
         file.flush()
-        file.write("\n")
-        file.write("  " + cls.error_msg.replace("Error", "\x1b[1;31mError\x1b[0m") + ".\n")
-        file.write("  " + f"\x1b[4m{cls.explanation}\x1b[0m" + ".\n")
-        file.write("  " + cls.suggestion + ".\n")
-        file.write("\n")
+
+        try:
+            os.write(file.fileno(), cls._rendered.encode())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            file.write(cls._rendered)
+
         file.flush()
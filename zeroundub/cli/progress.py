@@ -1,6 +1,7 @@
-import os
 import sys
 import tqdm
+import atexit
+import functools
 
 from typing import Type
 
@@ -8,23 +9,52 @@ from .error import AbstractProgressError
 
 
 # noinspection PyBroadException
+@functools.lru_cache(maxsize=1)
 def remove_ctrl_c_echo():
     try:
-        if "linux" in sys.platform and sys.stdout.isatty():
-            os.system("stty -echoctl")
+        if "linux" not in sys.platform or not sys.stdout.isatty() or not sys.stdin.isatty():
+            return
+
+        import termios  # pylint: disable=import-outside-toplevel
+
+        stdin_fd = sys.stdin.fileno()
+        original_attrs = termios.tcgetattr(stdin_fd)
+
+        attrs = termios.tcgetattr(stdin_fd)
+        attrs[3] &= ~termios.ECHOCTL
+        termios.tcsetattr(stdin_fd, termios.TCSANOW, attrs)
+
+        atexit.register(termios.tcsetattr, stdin_fd, termios.TCSANOW, original_attrs)
     except Exception:
         pass
 
 
 class Progress:
-    def __init__(self, desc: str, error: Type[AbstractProgressError], tpad=20, ncols=50):
+    __slots__ = ("error", "failed", "pbar", "_pending", "_threshold")
+
+    def __new__(cls, *args, **kwargs):  # pylint: disable=unused-argument
+        # nobody is watching a redirected output: just keep count instead of drawing a bar
+        if cls is Progress and not sys.stdout.isatty():
+            cls = NullProgress
+
+        return super().__new__(cls)
+
+    def __init__(self, desc: str, error: Type[AbstractProgressError], tpad=20, ncols=50, position=None):
         self.error = error
+        self.failed = False
+
+        # ticks are accumulated and forwarded to tqdm at most ~200 times per stage
+        self._pending = 0
+        self._threshold = 1
+
         self.pbar = tqdm.tqdm(
             bar_format=f"{{desc}}: {{percentage:3.0f}}% ┤{{bar:{ncols}}}├ {{n_fmt}}/{{total_fmt}}{{bar:-{ncols}b}}",
             desc=f"  \x1b[93m{desc:{tpad}s}\x1b[0m",
             smoothing=1,
             colour="blue",
             file=sys.stdout,
+            position=position,
+            mininterval=0.1,
         )
 
     def __enter__(self):
@@ -32,7 +62,14 @@ class Progress:
         return self
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
-        if exc_type is not None or self.pbar.n < self.pbar.total:
+        if exc_type is not None and issubclass(exc_type, SystemExit):
+            # the error has already been reported by another (nested) progress
+            self.pbar.close()
+            return
+
+        self._flush()
+
+        if exc_type is not None or self.failed or self.pbar.n < self.pbar.total:
             self.pbar.colour = "red"
             self.pbar.refresh()
             self.pbar.close()
@@ -47,11 +84,62 @@ class Progress:
         self.pbar.refresh()
         self.pbar.close()
 
+    def fail(self):
+        self.failed = True
+
+    def _flush(self):
+        if self._pending:
+            self.pbar.update(self._pending)
+            self._pending = 0
+
     def __call__(self, total=None):
         if total:
             self.pbar.total = total
             self.pbar.n = 0
-        else:
-            self.pbar.update(1)
+            self._pending = 0
+            self._threshold = max(1, total // 200)
+            self.pbar.miniters = self._threshold
+            self.pbar.refresh()
+            return
 
-        self.pbar.refresh()
+        self._pending += 1
+
+        if self._pending >= self._threshold:
+            self._flush()
+
+
+class NullProgress(Progress):
+    __slots__ = ("desc", "tpad", "n", "total")
+
+    # pylint: disable-next=super-init-not-called,unused-argument
+    def __init__(self, desc: str, error: Type[AbstractProgressError], tpad=20, ncols=50, position=None):
+        self.error = error
+        self.failed = False
+
+        self.desc = desc
+        self.tpad = tpad
+        self.n = 0
+        self.total = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is not None and issubclass(exc_type, SystemExit):
+            return
+
+        if exc_type is not None or self.failed or self.n < self.total:
+            print(f"  {self.desc:{self.tpad}s}: failed", flush=True)
+
+            self.error.print()
+            sys.exit(1)
+
+        print(f"  {self.desc:{self.tpad}s}: done", flush=True)
+
+    def __call__(self, total=None):
+        if total:
+            self.total = total
+            self.n = 0
+            return
+
+        self.n += 1
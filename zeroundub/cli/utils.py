@@ -1,26 +1,231 @@
 import os
-import math
+import sys
+import mmap
+import errno
+import queue
+import threading
 
 
-def copy_file(src, dst, callback=None):
-    with open(src, "rb") as src_fh:
-        src_size = src_fh.seek(0, os.SEEK_END)
-        src_fh.seek(0, os.SEEK_SET)
+# errors meaning "not supported for these files", after which a plain read/write copy is used
+_KERNEL_COPY_UNSUPPORTED = (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF)
+
+
+def _fadvise(file_h, advice_name: str, offset=0, length=0):
+    advice = getattr(os, advice_name, None)
+
+    if advice is None or not hasattr(os, "posix_fadvise"):
+        return
+
+    try:
+        os.posix_fadvise(file_h.fileno(), offset, length, advice)
+    except OSError:
+        pass
+
+
+def _fallocate(file_h, size: int):
+    if not size or not hasattr(os, "posix_fallocate"):
+        return
+
+    try:
+        os.posix_fallocate(file_h.fileno(), 0, size)
+    except OSError:
+        pass
+
+
+def _read_ahead(src_fh, blocks: "list[tuple[int, int]]", free: queue.Queue, read: queue.Queue, stop: threading.Event):
+    try:
+        for offset, length in blocks:
+            buffer = free.get()
+
+            if stop.is_set():
+                return
+
+            src_fh.seek(offset)
+            with memoryview(buffer) as view:
+                size = src_fh.readinto(view[:length])
+
+            read.put((buffer, offset, size))
+
+            if size < length:
+                break
+
+        read.put(None)
+    except Exception as exc:  # pylint: disable=broad-except
+        read.put(exc)
+
+
+def _kernel_copy_function():
+    if hasattr(os, "copy_file_range"):
 
-        block_size = 2**20
+        def _copy_file_range(src_fd, dst_fd, count, offset):
+            return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+        return _copy_file_range
+
+    if "linux" in sys.platform and hasattr(os, "sendfile"):
+
+        def _sendfile(src_fd, dst_fd, count, offset):
+            # sendfile only takes an offset for the source, the destination is written at its current position
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            return os.sendfile(dst_fd, src_fd, offset, count)
+
+        return _sendfile
+
+    return None
+
+
+def _copy_in_kernel(src_fh, dst_fh, blocks: "list[tuple[int, int]]", callback=None):
+    copy_function = _kernel_copy_function()
+
+    if copy_function is None:
+        return False
+
+    src_fd = src_fh.fileno()
+    dst_fd = dst_fh.fileno()
+
+    started = False
+    for block_start, length in blocks:
+        offset = block_start
+        block_end = block_start + length
+
+        while offset < block_end:
+            try:
+                copied = copy_function(src_fd, dst_fd, block_end - offset, offset)
+            except OSError as exc:
+                if not started and exc.errno in _KERNEL_COPY_UNSUPPORTED:
+                    return False
+                raise
+
+            if copied == 0:
+                raise OSError(errno.EIO, "unexpected end of file while copying")
+
+            started = True
+            offset += copied
+
+        _fadvise(dst_fh, "POSIX_FADV_DONTNEED", block_start, length)
 
         if callback:
-            block_num = int(math.ceil(src_size / block_size))
-            callback(block_num)
+            callback()
 
-        with open(dst, "wb") as dst_fh:
-            while True:
-                data = src_fh.read(block_size)
+    return True
+
+
+def _madvise(mapped: mmap.mmap, advice_name: str, *args):
+    advice = getattr(mmap, advice_name, None)
 
-                if not data:
-                    break
+    if advice is None or not hasattr(mapped, "madvise"):
+        return
 
-                dst_fh.write(data)
+    try:
+        mapped.madvise(advice, *args)
+    except OSError:
+        pass
+
+
+def _copy_mapped(src_fh, dst_fh, src_size: int, blocks: "list[tuple[int, int]]", callback=None):
+    # write straight from the page cache of the source: no read() copy and no intermediate python objects
+    try:
+        mapped = mmap.mmap(src_fh.fileno(), src_size, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, OverflowError):
+        return False
+
+    with mapped:
+        _madvise(mapped, "MADV_SEQUENTIAL")
+
+        with memoryview(mapped) as view:
+            for offset, length in blocks:
+                dst_fh.seek(offset)
+                dst_fh.write(view[offset : offset + length])
+
+                _madvise(mapped, "MADV_DONTNEED", offset, length)
+                _fadvise(dst_fh, "POSIX_FADV_DONTNEED", offset, length)
 
                 if callback:
                     callback()
+
+    return True
+
+
+def _copy_read_ahead(src_fh, dst_fh, blocks: "list[tuple[int, int]]", block_size: int, callback=None, queue_depth=4):
+    # read block N+1 in the background while block N is being written. blocks are read into a fixed set of
+    # buffers that go back and forth between the two threads, so no memory is allocated while copying
+    free: queue.Queue = queue.Queue()
+    for _ in range(queue_depth + 1):
+        free.put(bytearray(block_size))
+
+    read: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    reader = threading.Thread(target=_read_ahead, args=(src_fh, blocks, free, read, stop), daemon=True)
+    reader.start()
+
+    try:
+        while True:
+            block = read.get()
+
+            if block is None:
+                break
+
+            if isinstance(block, Exception):
+                raise block
+
+            buffer, offset, size = block
+
+            if not size:
+                break
+
+            dst_fh.seek(offset)
+            with memoryview(buffer) as view:
+                dst_fh.write(view[:size])
+
+            free.put(buffer)
+
+            # written data is not needed by this process anymore, keep it out of the page cache
+            _fadvise(dst_fh, "POSIX_FADV_DONTNEED", offset, size)
+
+            if callback:
+                callback()
+    finally:
+        stop.set()
+        while reader.is_alive():
+            free.put(bytearray(0))
+            reader.join(0.1)
+
+
+def _split_blocks(src_size: int, block_size: int, skip: "list[tuple[int, int]] | None" = None):
+    # (offset, length) of the blocks to copy, leaving out the skipped (offset, length) ranges of the source
+    blocks: list[tuple[int, int]] = []
+
+    offset = 0
+    for skip_offset, skip_size in sorted(skip or []) + [(src_size, 0)]:
+        end = min(skip_offset, src_size)
+        blocks.extend((start, min(block_size, end - start)) for start in range(offset, end, block_size))
+        offset = max(offset, skip_offset + skip_size)
+
+    return blocks
+
+
+def copy_file(src, dst, callback=None, queue_depth=4, src_size: "int | None" = None, skip=None):
+    with open(src, "rb") as src_fh:
+        if src_size is None:
+            src_size = os.fstat(src_fh.fileno()).st_size
+
+        # ~512 blocks per file, between 1 MiB and 16 MiB each (always a whole number of MiB, i.e. page aligned)
+        block_size = min(2**24, max(2**20, src_size // 512 // 2**20 * 2**20))
+        blocks = _split_blocks(src_size, block_size, skip)
+
+        _fadvise(src_fh, "POSIX_FADV_SEQUENTIAL")
+
+        if callback:
+            callback(len(blocks))
+
+        with open(dst, "wb") as dst_fh:
+            # reserve the whole iso at once, so the filesystem can lay it out in a few large extents
+            _fallocate(dst_fh, src_size)
+
+            # let the kernel copy the data (possibly as a reflink) without moving it through user space
+            if not _copy_in_kernel(src_fh, dst_fh, blocks, callback):
+                if not _copy_mapped(src_fh, dst_fh, src_size, blocks, callback):
+                    _copy_read_ahead(src_fh, dst_fh, blocks, block_size, callback, queue_depth)
+
+            # skipped ranges are left as holes, which also need to be there at the end of the file
+            dst_fh.truncate(src_size)
@@ -1,33 +1,17 @@
 import os
 import re
 import sys
-import inspect
 import argparse
+import subprocess
 import threading
 import tkinter as tk
 
 from typing import Type
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
 from tkinter import filedialog as fd
-from pycdlib.pycdlibexception import PyCdlibInvalidInput
-
-from zeroundub.cli.utils import copy_file
-from zeroundub.zero.iso import (
-    check_iso_hashes,
-    replace_movies_in_iso_inplace,
-    patch_elf_inplace,
-    merge_iso_img_bd_contents,
-)
 
 from zeroundub.cli.error import AbstractProgressError
-from zeroundub.cli.cmdline.undub import (
-    ProgressErrorCRCEU,
-    ProgressErrorCRCJP,
-    ProgressErrorISOCopy,
-    ProgressErrorMoviePatch,
-    ProgressErrorELFPatch,
-    ProgressErrorGamePatch,
-)
 
 
 class Progress:
@@ -44,80 +28,258 @@ class Progress:
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
         if exc_type is not None:
-            self._make_red(self.label_name)
-            self._make_red(self.label_perc)
-            self._make_red(self.app.label_info)
-            self.app.label_info["text"] = (
-                ".\n\n".join((self.error.error_msg, self.error.explanation, self.error.suggestion)) + "."
-            )
+            self.app.after(0, self._show_error)
+
+    def _show_error(self):
+        self._make_red(self.label_name)
+        self._make_red(self.label_perc)
+        self._make_red(self.app.label_info)
+        self.app.label_info["text"] = (
+            ".\n\n".join((self.error.error_msg, self.error.explanation, self.error.suggestion)) + "."
+        )
+
+
+# leading indentation of every line (help texts are written indented in the source)
+HELP_TEXT_INDENT = re.compile(r"^ *", flags=re.MULTILINE)
 
 
 def format_help_text(text):
-    return re.sub(r"^(:?( *)$|( *))", r"", text.strip(), flags=re.MULTILINE).replace("$", " ")
+    return HELP_TEXT_INDENT.sub("", text.strip()).replace("$", " ")
+
+
+# help texts are formatted once, at import time
+BUTTON_HELP_TEXTS = {
+    "iso_eu": format_help_text(
+        """
+        Select an untouched European ISO file.
+        
+        This file will be used as base for the undub.
+    """  # noqa: E501 # pylint: disable=line-too-long
+    ),
+    "iso_jp": format_help_text(
+        """
+        Select an untouched Japanese ISO file.
+
+        This file will be used to extract japanese voices.
+    """  # noqa: E501 # pylint: disable=line-too-long
+    ),
+    "iso_undub": format_help_text(
+        """
+        Choose the output path for the undub ISO file.
+        
+        This will be the path where the undub ISO will be written to.
+    """  # noqa: E501 # pylint: disable=line-too-long
+    ),
+    "start_undub": format_help_text(
+        """
+        Starts the undub process.
+        
+        Progress will be shown below by the 6 progress bars. If an error occurs at any point, the corresponding progress bar's text
+        will become red, and an error description will be shown here.
+    """  # noqa: E501 # pylint: disable=line-too-long
+    ),
+}
+
+# name (of the check_* widget and of the var_* variable), text and help text of each patch
+PATCH_CHECKBUTTONS = [
+    (
+        "fix_kirie_camera_bug",
+        "Fix Kirie Camera Bug",
+        format_help_text(
+            """
+            Fix Kirie Camera Bug.
+            
+            Fix for the Kirie Camera Bug, where aiming the camera to a certain spot during the last battle with
+            Kirie may result in a game freeze.
+
+            Thanks to weirdbeardgame for the fix.
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+    (
+        "16_9",
+        "Force 16:9",
+        format_help_text(
+            """
+            Enable the 16:9 aspect ratio patch.
+            
+            Ingame will be rendered in 16:9 and movies will have black bars to preserve the original aspect ratio.
+            
+            Menus, on screen text and graphics, and the title screen will be stretched.
+            
+            Remember to force 16:9 aspect ratio in you TV!
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+    (
+        "disable_bloom",
+        "Disable Bloom Effect",
+        format_help_text(
+            """
+            Disable ingame bloom effect.
+            
+            Ingame bloom effect will be disabled.
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+    (
+        "remove_dark_filter",
+        "Remove Dark Filter",
+        format_help_text(
+            """
+            Removes ingame dark filter.
+            
+            Ingame dark filter will be disabled.
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+    (
+        "remove_ingame_noise",
+        "Remove Ingame Noise",
+        format_help_text(
+            """
+            Remove ingame noise.
+            
+            Ingame noise effect will be removed.
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+    (
+        "remove_title_noise",
+        "Remove Title Noise",
+        format_help_text(
+            """
+            Remove title noise.
+            
+            Title noise effect will be removed
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+    (
+        "force_language_selection",
+        "Force Language Selection",
+        format_help_text(
+            """
+            Force language selection on launch.
+            
+            Language selection will be shown at every game launch.
+            
+            Note that this hack disables loading user preferences at startup completely (as language is one of the preferences).
+            This means that settings such as brightness and volume would also be reset to default every time.
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+    (
+        "replace_title_jp",
+        "Japanese Title Screen",
+        format_help_text(
+            """
+            Replace title screen with the Japanese one.
+            
+            The title screen will be replaced with the one found in the Japanese version.
+            
+            Menu entries and menu fonts will not change as the Japanese ones are not compatible and cannot be replaced.
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+    (
+        "replace_models",
+        "Replace Models",
+        format_help_text(
+            """
+            Replace all Miku models with the original Japanese version.
+            
+            All Miku models, including both 3D and 2D ones such as the menu portrait and the background image
+            displayed at the beginning of each night, will be replaced with the ones found in the Japanese version.
+        """  # noqa: E501 # pylint: disable=line-too-long
+        ),
+    ),
+]
+
+# stage name (of the label_*, progress_* and var_progress_* widgets) and text of each progress bar
+PROGRESS_STAGES = [
+    ("eu_check", "Checking EU ISO"),
+    ("jp_check", "Checking JP ISO"),
+    ("copy", "Copying ISO"),
+    ("movies", "Patching Movies"),
+    ("elf", "Patching ELF"),
+    ("contents", "Patching Contents"),
+]
 
 
 class UndubThread(threading.Thread):
+    # how often (ms) the progress of the worker thread is shown in the ui
+    flush_interval = 50
+
     def __init__(self, app: "App"):
         super().__init__()
         self.app = app
-        self.total = 0
-        self.current = 0
 
-    def __getattribute__(self, name: str):
-        attribute = super().__getattribute__(name)
+        # (current, total) of each stage, updated by the worker thread and read by the ui thread
+        self.progress: dict[str, list[int]] = {}
+        self._scale: dict[str, float] = {}
+        self._shown: dict[str, tuple[int, int]] = {}
 
-        if inspect.ismethod(attribute) and name.startswith("do_"):
+    def _post(self, function, *args):
+        # tk widgets must only be touched by the ui thread
+        self.app.after(0, lambda: function(*args))
 
-            def outer(*args, **kwargs):
-                def inner():
-                    attribute(*args, **kwargs)
+    def start(self):
+        super().start()
+        self._flush_progress()
 
-                self.app.after(0, inner)
+    def do_close(self):
+        self.app.quit()
 
-            return outer
+    def _begin(self, stage: str, total: int):
+        # runs on the worker thread at the start of a stage
+        self._scale[stage] = 100 / total
+        self.progress[stage][:] = [0, total]
 
-        return attribute
+    def _flush_progress(self):
+        # checked first, so that the ticks of a finished worker are always shown by one last flush
+        alive = self.is_alive()
+        changed = False
 
-    def do_close(self):
-        self.app.quit()
+        for stage, (current, total) in list(self.progress.items()):
+            if not total or self._shown.get(stage) == (current, total):
+                continue
 
-    def _update_progress(self, var_progress: tk.DoubleVar, label: ttk.Label, label_perc: ttk.Label, total=None):
-        if total:
-            self.current = 0
-            self.total = total
-            label.state(["!disabled"])
-            label_perc.state(["!disabled"])
-            label_perc["text"] = f"0/{total}"
-            var_progress.set(0)
-        else:
-            self.current += 1
-            value = 100 * self.current / self.total
-            label_perc["text"] = f"{self.current}/{self.total}"
-            var_progress.set(value)
-
-    def do_eu_check_cb(self, total=None):
-        self._update_progress(
-            self.app.var_progress_eu_check, self.app.label_eu_check, self.app.label_eu_check_perc, total
-        )
+            label = getattr(self.app, f"label_{stage}")
+            label_perc = getattr(self.app, f"label_{stage}_perc")
+            var_progress = getattr(self.app, f"var_progress_{stage}")
 
-    def do_jp_check_cb(self, total=None):
-        self._update_progress(
-            self.app.var_progress_jp_check, self.app.label_jp_check, self.app.label_jp_check_perc, total
-        )
+            if stage not in self._shown:
+                label.state(["!disabled"])
+                label_perc.state(["!disabled"])
 
-    def do_copy_file_cp(self, total=None):
-        self._update_progress(self.app.var_progress_copy, self.app.label_copy, self.app.label_copy_perc, total)
+            label_perc["text"] = f"{current}/{total}"
+            var_progress.set(current * self._scale[stage])
 
-    def do_replace_movies_cp(self, total=None):
-        self._update_progress(self.app.var_progress_movies, self.app.label_movies, self.app.label_movies_perc, total)
+            self._shown[stage] = (current, total)
+            changed = True
 
-    def do_patch_elf_cp(self, total=None):
-        self._update_progress(self.app.var_progress_elf, self.app.label_elf, self.app.label_elf_perc, total)
+        # redraw all the changed bars and labels in a single pass (without processing other events like update())
+        if changed:
+            self.app.update_idletasks()
 
-    def do_merge_iso_cp(self, total=None):
-        self._update_progress(
-            self.app.var_progress_contents, self.app.label_contents, self.app.label_contents_perc, total
-        )
+        if alive:
+            self.app.after(self.flush_interval, self._flush_progress)
+
+    def _progress(self, stage: str, error: Type[AbstractProgressError]):
+        return Progress(self.app, getattr(self.app, f"label_{stage}"), getattr(self.app, f"label_{stage}_perc"), error)
+
+    def _callback(self, stage: str):
+        # runs on the worker thread for every tick: only count, the ui is updated by _flush_progress
+        counter = self.progress.setdefault(stage, [0, 0])
+
+        def callback(total=None):
+            if total:
+                self._begin(stage, total)
+            else:
+                counter[0] += 1
+
+        return callback
 
     def do_done(self):
         self.app.label_info["text"] = format_help_text(
@@ -131,36 +293,59 @@ class UndubThread(threading.Thread):
         self.app.button_done.state(["!disabled"])
 
     def run(self) -> None:
+        # pylint: disable=import-outside-toplevel
+        # the iso stack (pycdlib, numpy) is only loaded once the undub starts, so the window shows up sooner
+        from pycdlib.pycdlibexception import PyCdlibInvalidInput
+
+        from zeroundub.cli.utils import copy_file
+        from zeroundub.zero.iso import (
+            check_iso_hashes,
+            replace_movies_in_iso_inplace,
+            patch_elf_inplace,
+            merge_iso_img_bd_contents,
+            get_img_bd_extent,
+        )
+        from zeroundub.cli.cmdline.undub import (
+            ProgressErrorCRCEU,
+            ProgressErrorCRCJP,
+            ProgressErrorISOCopy,
+            ProgressErrorMoviePatch,
+            ProgressErrorELFPatch,
+            ProgressErrorGamePatch,
+        )
+
         try:
-            with Progress(self.app, self.app.label_eu_check, self.app.label_eu_check_perc, ProgressErrorCRCEU):
-                check_iso_hashes(
-                    self.app.eu_iso_path,
-                    lang="EU",
-                    callback=self.do_eu_check_cb,
+            # both isos are checked at the same time, errors are then reported in order (eu first)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                check_eu = executor.submit(
+                    check_iso_hashes, self.app.eu_iso_path, lang="EU", callback=self._callback("eu_check")
                 )
-
-            with Progress(self.app, self.app.label_jp_check, self.app.label_jp_check_perc, ProgressErrorCRCJP):
-                check_iso_hashes(
-                    self.app.jp_iso_path,
-                    lang="JP",
-                    callback=self.do_jp_check_cb,
+                check_jp = executor.submit(
+                    check_iso_hashes, self.app.jp_iso_path, lang="JP", callback=self._callback("jp_check")
                 )
 
-            with Progress(self.app, self.app.label_copy, self.app.label_copy_perc, ProgressErrorISOCopy):
+            with self._progress("eu_check", ProgressErrorCRCEU):
+                check_eu.result()
+
+            with self._progress("jp_check", ProgressErrorCRCJP):
+                check_jp.result()
+
+            with self._progress("copy", ProgressErrorISOCopy):
                 copy_file(
                     self.app.eu_iso_path,
                     self.app.undub_iso_path,
-                    self.do_copy_file_cp,
+                    self._callback("copy"),
+                    skip=[get_img_bd_extent(self.app.eu_iso_path)],
                 )
 
-            with Progress(self.app, self.app.label_movies, self.app.label_movies_perc, ProgressErrorMoviePatch):
+            with self._progress("movies", ProgressErrorMoviePatch):
                 replace_movies_in_iso_inplace(
                     self.app.jp_iso_path,
                     self.app.undub_iso_path,
-                    self.do_replace_movies_cp,
+                    self._callback("movies"),
                 )
 
-            with Progress(self.app, self.app.label_elf, self.app.label_elf_perc, ProgressErrorELFPatch):
+            with self._progress("elf", ProgressErrorELFPatch):
                 patch_elf_inplace(
                     self.app.undub_iso_path,
                     fix_kirie_camera_bug=self.app.var_fix_kirie_camera_bug.get(),
@@ -171,10 +356,10 @@ class UndubThread(threading.Thread):
                     menu_noise=self.app.var_remove_title_noise.get(),
                     force_16_9_game=self.app.var_16_9.get(),
                     force_16_9_movies=self.app.var_16_9.get(),
-                    callback=self.do_patch_elf_cp,
+                    callback=self._callback("elf"),
                 )
 
-            with Progress(self.app, self.app.label_contents, self.app.label_contents_perc, ProgressErrorGamePatch):
+            with self._progress("contents", ProgressErrorGamePatch):
                 merge_iso_img_bd_contents(
                     eu_iso_path=self.app.eu_iso_path,
                     jp_iso_path=self.app.jp_iso_path,
@@ -182,10 +367,11 @@ class UndubThread(threading.Thread):
                     replace_title_jp=self.app.var_replace_title_jp.get(),
                     replace_models=self.app.var_replace_models.get(),
                     replace_sfx=True,
-                    callback=self.do_merge_iso_cp,
+                    callback=self._callback("contents"),
+                    img_bd_copied=False,
                 )
 
-            self.do_done()
+            self._post(self.do_done)
         except (RuntimeError, PyCdlibInvalidInput):
             return
 
@@ -198,6 +384,7 @@ class App(ttk.Frame):
         ttk.Frame.__init__(self)
 
         self._undub_started = False
+        self._info_text = ""
 
         self.patch_frame: ttk.LabelFrame
 
@@ -276,6 +463,21 @@ class App(ttk.Frame):
         # Create widgets :)
         self.setup_widgets()
 
+        # widgets enabled and disabled together
+        self._iso_controls = (self.button_iso_eu, self.button_iso_jp, self.button_iso_undub)
+        self._patch_controls = (
+            self.check_fix_kirie_camera_bug,
+            self.check_16_9,
+            self.check_disable_bloom,
+            self.check_remove_dark_filter,
+            self.check_remove_ingame_noise,
+            self.check_remove_title_noise,
+            self.check_force_language_selection,
+            self.check_replace_title_jp,
+            self.check_replace_models,
+            self.button_start_undub,
+        )
+
         self.undub_thread: threading.Thread
 
     def setup_widgets(self):
@@ -296,42 +498,21 @@ class App(ttk.Frame):
         # Button ISO EU
         self.button_iso_eu = ttk.Button(self.widgets_frame, text="(1) Select European ISO", command=self.select_eu_iso)
         self.button_iso_eu.grid(row=0, column=0, padx=0, pady=0, sticky="nsew", ipadx=10)
-        self.add_help(
-            self.button_iso_eu,
-            """
-            Select an untouched European ISO file.
-            
-            This file will be used as base for the undub.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
+        self.add_help(self.button_iso_eu, BUTTON_HELP_TEXTS["iso_eu"])
 
         # Button ISO JP
         self.button_iso_jp = ttk.Button(
             self.widgets_frame, text="(2) Select Japanese ISO", state="disabled", command=self.select_jp_iso
         )
         self.button_iso_jp.grid(row=1, column=0, padx=0, pady=(10, 0), sticky="nsew", ipadx=10)
-        self.add_help(
-            self.button_iso_jp,
-            """
-            Select an untouched Japanese ISO file.
-
-            This file will be used to extract japanese voices.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
+        self.add_help(self.button_iso_jp, BUTTON_HELP_TEXTS["iso_jp"])
 
         # Button ISO Undub
         self.button_iso_undub = ttk.Button(
             self.widgets_frame, text="(3) Choose Output Undub ISO", state="disabled", command=self.select_undub_iso
         )
         self.button_iso_undub.grid(row=2, column=0, padx=0, pady=(10, 0), sticky="nsew", ipadx=10)
-        self.add_help(
-            self.button_iso_undub,
-            """
-            Choose the output path for the undub ISO file.
-            
-            This will be the path where the undub ISO will be written to.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
+        self.add_help(self.button_iso_undub, BUTTON_HELP_TEXTS["iso_undub"])
 
         # ################################
         # Create a Frame for the Hack Checkbuttons
@@ -339,145 +520,17 @@ class App(ttk.Frame):
         self.patch_frame.grid(row=0, column=1, padx=(20, 20), pady=(20, 0), sticky="nsew", rowspan=1)
         self.patch_frame.columnconfigure(index=0, weight=1)
 
-        check_pad_top = 4
-
         # Checkbuttons
-        self.check_fix_kirie_camera_bug = ttk.Checkbutton(
-            self.patch_frame, text="Fix Kirie Camera Bug", variable=self.var_fix_kirie_camera_bug, state="disabled"
-        )
-        self.check_fix_kirie_camera_bug.grid(row=0, column=0, padx=0, pady=(10, check_pad_top), sticky="nsew")
-        self.add_help(
-            self.check_fix_kirie_camera_bug,
-            """
-            Fix Kirie Camera Bug.
-            
-            Fix for the Kirie Camera Bug, where aiming the camera to a certain spot during the last battle with
-            Kirie may result in a game freeze.
-
-            Thanks to weirdbeardgame for the fix.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
+        for row, (name, text, help_text) in enumerate(PATCH_CHECKBUTTONS):
+            pady = (10 if row == 0 else 4, 10 if row == len(PATCH_CHECKBUTTONS) - 1 else 4)
 
-        self.check_16_9 = ttk.Checkbutton(self.patch_frame, text="Force 16:9", variable=self.var_16_9, state="disabled")
-        self.check_16_9.grid(row=1, column=0, padx=0, pady=check_pad_top, sticky="nsew")
-        self.add_help(
-            self.check_16_9,
-            """
-            Enable the 16:9 aspect ratio patch.
-            
-            Ingame will be rendered in 16:9 and movies will have black bars to preserve the original aspect ratio.
-            
-            Menus, on screen text and graphics, and the title screen will be stretched.
-            
-            Remember to force 16:9 aspect ratio in you TV!
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
-
-        self.check_disable_bloom = ttk.Checkbutton(
-            self.patch_frame, text="Disable Bloom Effect", variable=self.var_disable_bloom, state="disabled"
-        )
-        self.check_disable_bloom.grid(row=2, column=0, padx=0, pady=check_pad_top, sticky="nsew")
-        self.add_help(
-            self.check_disable_bloom,
-            """
-            Disable ingame bloom effect.
-            
-            Ingame bloom effect will be disabled.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
-
-        self.check_remove_dark_filter = ttk.Checkbutton(
-            self.patch_frame, text="Remove Dark Filter", variable=self.var_remove_dark_filter, state="disabled"
-        )
-        self.check_remove_dark_filter.grid(row=3, column=0, padx=0, pady=check_pad_top, sticky="nsew")
-        self.add_help(
-            self.check_remove_dark_filter,
-            """
-            Removes ingame dark filter.
-            
-            Ingame dark filter will be disabled.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
-
-        self.check_remove_ingame_noise = ttk.Checkbutton(
-            self.patch_frame, text="Remove Ingame Noise", variable=self.var_remove_ingame_noise, state="disabled"
-        )
-        self.check_remove_ingame_noise.grid(row=4, column=0, padx=0, pady=check_pad_top, sticky="nsew")
-        self.add_help(
-            self.check_remove_ingame_noise,
-            """
-            Remove ingame noise.
-            
-            Ingame noise effect will be removed.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
-
-        self.check_remove_title_noise = ttk.Checkbutton(
-            self.patch_frame, text="Remove Title Noise", variable=self.var_remove_title_noise, state="disabled"
-        )
-        self.check_remove_title_noise.grid(row=5, column=0, padx=0, pady=check_pad_top, sticky="nsew")
-        self.add_help(
-            self.check_remove_title_noise,
-            """
-            Remove title noise.
-            
-            Title noise effect will be removed
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
-
-        self.check_force_language_selection = ttk.Checkbutton(
-            self.patch_frame,
-            text="Force Language Selection",
-            variable=self.var_force_language_selection,
-            state="disabled",
-        )
-        self.check_force_language_selection.grid(row=6, column=0, padx=0, pady=check_pad_top, sticky="nsew")
-        self.add_help(
-            self.check_force_language_selection,
-            """
-            Force language selection on launch.
-            
-            Language selection will be shown at every game launch.
-            
-            Note that this hack disables loading user preferences at startup completely (as language is one of the preferences).
-            This means that settings such as brightness and volume would also be reset to default every time.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
-
-        self.check_replace_title_jp = ttk.Checkbutton(
-            self.patch_frame,
-            text="Japanese Title Screen",
-            variable=self.var_replace_title_jp,
-            state="disabled",
-        )
-        self.check_replace_title_jp.grid(row=7, column=0, padx=0, pady=check_pad_top, sticky="nsew")
-        self.add_help(
-            self.check_replace_title_jp,
-            """
-            Replace title screen with the Japanese one.
-            
-            The title screen will be replaced with the one found in the Japanese version.
-            
-            Menu entries and menu fonts will not change as the Japanese ones are not compatible and cannot be replaced.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
+            checkbutton = ttk.Checkbutton(
+                self.patch_frame, text=text, variable=getattr(self, f"var_{name}"), state="disabled"
+            )
+            checkbutton.grid(row=row, column=0, padx=0, pady=pady, sticky="nsew")
+            self.add_help(checkbutton, help_text)
 
-        self.check_replace_models = ttk.Checkbutton(
-            self.patch_frame,
-            text="Replace Models",
-            variable=self.var_replace_models,
-            state="disabled",
-        )
-        self.check_replace_models.grid(row=8, column=0, padx=0, pady=(check_pad_top, 10), sticky="nsew")
-        self.add_help(
-            self.check_replace_models,
-            """
-            Replace all Miku models with the original Japanese version.
-            
-            All Miku models, including both 3D and 2D ones such as the menu portrait and the background image
-            displayed at the beginning of each night, will be replaced with the ones found in the Japanese version.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
+            setattr(self, f"check_{name}", checkbutton)
 
         # ################################
         # Progress Frame
@@ -490,15 +543,7 @@ class App(ttk.Frame):
             self.progress_frame, text="(5) Start Undub", state="disabled", command=self.start_undub
         )
         self.button_start_undub.grid(row=0, column=0, padx=0, pady=(9, 10), sticky="nsew", ipadx=10)
-        self.add_help(
-            self.button_start_undub,
-            """
-            Starts the undub process.
-            
-            Progress will be shown below by the 6 progress bars. If an error occurs at any point, the corresponding progress bar's text
-            will become red, and an error description will be shown here.
-        """,  # noqa: E501 # pylint: disable=line-too-long
-        )
+        self.add_help(self.button_start_undub, BUTTON_HELP_TEXTS["start_undub"])
 
         # Progressbar
         self.pb_frame_box = ttk.Frame(self.progress_frame, padding=(0, 0, 0, 0))
@@ -507,38 +552,21 @@ class App(ttk.Frame):
         self.pb_frame_box.columnconfigure(index=1, weight=1)
         self.pb_frame_box.columnconfigure(index=2, weight=0, minsize=75)
 
-        def add_pb(_text, i, var, _pady=10):
-            label = ttk.Label(self.pb_frame_box, text=_text, state="disabled")
-            label.grid(row=i, column=0, pady=(0, _pady), sticky="w")
-
-            progress_undub = ttk.Progressbar(self.pb_frame_box, value=0, variable=var, mode="determinate")
-            progress_undub.grid(row=i, column=1, padx=(10, 10), pady=(0, _pady), sticky="ew")
-
-            # Label
-            label_progress = ttk.Label(self.pb_frame_box, text="?/?", state="disabled")
-            label_progress.grid(row=i, column=2, pady=(0, _pady), sticky="e")
-
-            return label, progress_undub, label_progress
+        for row, (stage, text) in enumerate(PROGRESS_STAGES):
+            label = ttk.Label(self.pb_frame_box, text=text, state="disabled")
+            label.grid(row=row, column=0, pady=(0, 10), sticky="w")
 
-        self.label_eu_check, self.progress_eu_check, self.label_eu_check_perc = add_pb(
-            "Checking EU ISO", 0, self.var_progress_eu_check
-        )
-
-        self.label_jp_check, self.progress_jp_check, self.label_jp_check_perc = add_pb(
-            "Checking JP ISO", 1, self.var_progress_jp_check
-        )
-
-        self.label_copy, self.progress_copy, self.label_copy_perc = add_pb("Copying ISO", 2, self.var_progress_copy)
+            progress = ttk.Progressbar(
+                self.pb_frame_box, value=0, variable=getattr(self, f"var_progress_{stage}"), mode="determinate"
+            )
+            progress.grid(row=row, column=1, padx=(10, 10), pady=(0, 10), sticky="ew")
 
-        self.label_movies, self.progress_movies, self.label_movies_perc = add_pb(
-            "Patching Movies", 3, self.var_progress_movies
-        )
+            label_perc = ttk.Label(self.pb_frame_box, text="?/?", state="disabled")
+            label_perc.grid(row=row, column=2, pady=(0, 10), sticky="e")
 
-        self.label_elf, self.progress_elf, self.label_elf_perc = add_pb("Patching ELF", 4, self.var_progress_elf)
-
-        self.label_contents, self.progress_contents, self.label_contents_perc = add_pb(
-            "Patching Contents", 5, self.var_progress_contents
-        )
+            setattr(self, f"label_{stage}", label)
+            setattr(self, f"progress_{stage}", progress)
+            setattr(self, f"label_{stage}_perc", label_perc)
 
         # Button Done
         self.button_done = ttk.Button(self.progress_frame, text="Done", state="disabled", command=self.undub_done)
@@ -569,6 +597,7 @@ class App(ttk.Frame):
         self.label_info.configure(anchor="nw")
         self.label_info.grid(row=0, column=0, pady=(0, 10), sticky="nsew")
         setattr(self.label_info, "_default_text", _default_text)
+        self._info_text = _default_text
 
         # ################################
         # Sizegrip
@@ -608,31 +637,10 @@ class App(ttk.Frame):
             if os.path.splitext(undub_iso_path.lower())[1] != ".iso":
                 undub_iso_path += ".iso"
             self.undub_iso_path = undub_iso_path
-            self.check_fix_kirie_camera_bug.state(["!disabled"])
-            self.check_16_9.state(["!disabled"])
-            self.check_disable_bloom.state(["!disabled"])
-            self.check_remove_dark_filter.state(["!disabled"])
-            self.check_remove_ingame_noise.state(["!disabled"])
-            self.check_remove_title_noise.state(["!disabled"])
-            self.check_force_language_selection.state(["!disabled"])
-            self.check_replace_title_jp.state(["!disabled"])
-            self.check_replace_models.state(["!disabled"])
-            self.button_start_undub.state(["!disabled"])
+            self._set_enabled(self._patch_controls, True)
 
     def start_undub(self):
-        self.button_iso_eu.state(["disabled"])
-        self.button_iso_jp.state(["disabled"])
-        self.button_iso_undub.state(["disabled"])
-        self.check_fix_kirie_camera_bug.state(["disabled"])
-        self.check_16_9.state(["disabled"])
-        self.check_disable_bloom.state(["disabled"])
-        self.check_remove_dark_filter.state(["disabled"])
-        self.check_remove_ingame_noise.state(["disabled"])
-        self.check_remove_title_noise.state(["disabled"])
-        self.check_force_language_selection.state(["disabled"])
-        self.check_replace_title_jp.state(["disabled"])
-        self.check_replace_models.state(["disabled"])
-        self.button_start_undub.state(["disabled"])
+        self._set_enabled(self._iso_controls + self._patch_controls, False)
 
         self._undub_started = True
         self.label_info["text"] = format_help_text(
@@ -650,8 +658,16 @@ class App(ttk.Frame):
     def undub_done(self):
         self.quit()
 
+    def _set_enabled(self, widgets: "tuple[ttk.Widget, ...]", enabled: bool):
+        flags = ["!disabled" if enabled else "disabled"]
+        for widget in widgets:
+            widget.state(flags)
+
+        # one redraw for the whole group
+        self.update_idletasks()
+
     def add_help(self, widget, help_text):
-        setattr(widget, "_help_text", format_help_text(help_text))
+        setattr(widget, "_help_text", help_text)
         widget.bind("<Enter>", self._show_help)
         widget.bind("<Leave>", self._show_help)
 
@@ -663,6 +679,12 @@ class App(ttk.Frame):
         if event.type == tk.EventType.Enter:
             text = getattr(event.widget, "_help_text", text)
         # elif event.type == tk.EventType.Leave:
+
+        # setting the same text again still makes tk lay out the label again
+        if text == self._info_text:
+            return
+
+        self._info_text = text
         self.label_info["text"] = text
 
     @staticmethod
@@ -683,7 +705,20 @@ def main():
 
     args = parser.parse_args()
 
-    if not args.foreground and hasattr(os, "fork") and os.fork():
+    if not args.foreground and hasattr(os, "fork"):
+        # detach by running a new foreground instance in its own session, instead of forking this interpreter
+        if getattr(sys, "frozen", False):
+            command = [sys.executable, *sys.argv[1:]]
+        else:
+            command = [sys.executable, os.path.abspath(sys.argv[0]), *sys.argv[1:]]
+
+        subprocess.Popen(  # pylint: disable=consider-using-with
+            [*command, "--foreground"],
+            start_new_session=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
         sys.exit()
 
     root = tk.Tk()
@@ -1,17 +1,130 @@
 import os
 import io
+import mmap
 import errno
 
 from typing import BinaryIO
+from contextlib import contextmanager
+
+
+# errors meaning "cannot copy in kernel between these files", after which the data goes through user space
+_COPY_RANGE_UNSUPPORTED = (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF)
+
+
+def _pread(fd: int, size: int, offset: int):
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _pwrite(fd: int, data: bytes, offset: int):
+    if hasattr(os, "pwrite"):
+        return os.pwrite(fd, data, offset)
+
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, data)
+
+
+def write_at(fd: int, data, offset: int):
+    # positional write of the whole of data (a single pwrite may write less than asked)
+    with memoryview(data) as view:
+        written = 0
+        while written < len(view):
+            written += _pwrite(fd, view[written:], offset + written)
+
+    return written
+
+
+def copy_range(src_fd: int, src_offset: int, dst_fd: int, dst_offset: int, length: int, chunk_size=2**20):
+    # positional copy between two descriptors: file positions are not used and the data stays in the kernel
+    # whenever copy_file_range (i.e. splice between files) is available for this pair of files
+    copy_file_range = getattr(os, "copy_file_range", None)
+
+    copied = 0
+    while copied < length:
+        count = min(chunk_size, length - copied)
+        done = 0
+
+        if copy_file_range is not None:
+            try:
+                done = copy_file_range(src_fd, dst_fd, count, src_offset + copied, dst_offset + copied)
+            except OSError as exc:
+                if exc.errno not in _COPY_RANGE_UNSUPPORTED:
+                    raise
+                copy_file_range = None
+
+        if not done:
+            data = _pread(src_fd, count, src_offset + copied)
+
+            if not data:
+                break
+
+            done = _pwrite(dst_fd, data, dst_offset + copied)
+
+        copied += done
+
+    return copied
+
+
+def advise(fd: int, offset: int, size: int, advice_name: str):
+    # access pattern hint for a range of an os file, where the platform has them (size 0 is up to the end)
+    advice = getattr(os, advice_name, None)
+
+    if advice is None or not hasattr(os, "posix_fadvise"):
+        return
+
+    try:
+        os.posix_fadvise(fd, offset, size, advice)
+    except OSError:
+        pass
+
+
+def _positional_fd(file_h: BinaryIO):
+    # only plain os files can be accessed via pread/pwrite, anything else (e.g. in-memory or pycdlib files) goes
+    # through seek and read/write
+    if not hasattr(os, "pread") or not isinstance(
+        file_h, (io.FileIO, io.BufferedReader, io.BufferedWriter, io.BufferedRandom)
+    ):
+        return None
+
+    try:
+        return file_h.fileno()
+    except (OSError, ValueError):
+        return None
 
 
 class SubFile(io.BufferedIOBase, BinaryIO):  # pylint: disable=abstract-method
-    def __init__(self, file_h: BinaryIO, offset: int, size: int):
+    def __init__(self, file_h: BinaryIO, offset: int, size: int, block_size=2**16):
         self.file_h: BinaryIO = file_h
         self.offset: int = offset
         self.size: int = size
         self.position: int = 0
 
+        # small reads (e.g. headers) are served from one cached block of whole 2048 bytes sectors
+        self.block_size: int = max(2048, block_size // 2048 * 2048)
+        self._block = b""
+        self._block_start = 0
+
+        # with a file descriptor every access is a single positional syscall, which does not move the position of
+        # file_h, so many sub files can share the same file (even across threads)
+        self._fd = _positional_fd(file_h)
+        self._writable = self._fd is not None and file_h.writable()
+
+    def _sync(self):
+        # data still buffered in file_h must reach the file before it is accessed via the file descriptor
+        if self._writable:
+            self.file_h.flush()
+
+    def _advise(self, advice_name: str):
+        if self._fd is not None:
+            advise(self._fd, self.offset, self.size, advice_name)
+
+    def will_need(self):
+        # the sub file is going to be read soon: the kernel reads it ahead in the background
+        self._advise("POSIX_FADV_WILLNEED")
+
     def tell(self):
         return self.position
 
@@ -43,14 +156,100 @@ class SubFile(io.BufferedIOBase, BinaryIO):  # pylint: disable=abstract-method
         else:
             raise TypeError(f"argument should be integer or None, not '{type(size)}'")
 
-        self.file_h.seek(self.offset + self.position)
+        if size < self.block_size:
+            data = self._read_cached(size)
+        else:
+            data = self._read_at(self.position, size)
+
         self.position += size
 
+        return data
+
+    def _read_at(self, position: int, size: int):
+        if self._fd is not None:
+            self._sync()
+            return os.pread(self._fd, size, self.offset + position)
+
+        self.file_h.seek(self.offset + position)
         return self.file_h.read(size)
 
+    def _read_cached(self, size: int):
+        start = self.position - self._block_start
+
+        if start < 0 or start + size > len(self._block):
+            # blocks start on a sector boundary of the underlying file
+            self._block_start = max(0, (self.offset + self.position) // 2048 * 2048 - self.offset)
+            start = self.position - self._block_start
+            self._block = self._read_at(
+                self._block_start, min(max(self.block_size, start + size), self.size - self._block_start)
+            )
+
+        return self._block[start : start + size]
+
     def write(self, data):
-        self.file_h.seek(self.offset + self.position)
+        self._block = b""
+
         bytes_to_write = min(self.size - self.position, len(data))
-        data_to_write = data[:bytes_to_write]
-        self.file_h.write(data_to_write)
+
+        # a view of the part to write, not a copy of it
+        with memoryview(data) as view, view[:bytes_to_write] as data_to_write:
+            if self._fd is not None:
+                self._sync()
+                written = 0
+                while written < bytes_to_write:
+                    written += os.pwrite(self._fd, data_to_write[written:], self.offset + self.position + written)
+            else:
+                self.file_h.seek(self.offset + self.position)
+                self.file_h.write(data_to_write)
+
         self.position += bytes_to_write
+
+    @contextmanager
+    def mmap(self):
+        # the whole sub file as a writable buffer: a memory map of the underlying file when possible (changes go
+        # straight to the page cache), otherwise a copy that is written back on exit
+        if self._fd is None or not self._writable:
+            self.seek(0)
+            data = bytearray(self.read())
+            yield memoryview(data)
+            self.seek(0)
+            self.write(data)
+            return
+
+        self._sync()
+        self._block = b""
+
+        # maps must start at a multiple of the allocation granularity
+        start = self.offset // mmap.ALLOCATIONGRANULARITY * mmap.ALLOCATIONGRANULARITY
+
+        with mmap.mmap(self._fd, self.offset - start + self.size, offset=start) as mapped:
+            with memoryview(mapped) as view, view[self.offset - start :] as data:
+                yield data
+
+            mapped.flush()
+
+    def getbuffer(self):
+        # the contents as a buffer: a view when the underlying file is itself a buffer (e.g. a memory map), otherwise
+        # a copy
+        try:
+            with memoryview(self.file_h) as view:
+                return view[self.offset : self.offset + self.size]
+        except TypeError:
+            return memoryview(self._read_at(0, self.size))
+
+    @contextmanager
+    def mapped(self):
+        # the same sub file over a memory map of the underlying file: every read and write becomes a copy from or to
+        # the page cache, instead of a syscall
+        if self._fd is None:
+            yield self
+            return
+
+        self._sync()
+        self._block = b""
+
+        start = self.offset // mmap.ALLOCATIONGRANULARITY * mmap.ALLOCATIONGRANULARITY
+        access = mmap.ACCESS_WRITE if self._writable else mmap.ACCESS_READ
+
+        with mmap.mmap(self._fd, self.offset - start + self.size, offset=start, access=access) as mapped:
+            yield SubFile(mapped, self.offset - start, self.size)  # pylint: disable=abstract-class-instantiated
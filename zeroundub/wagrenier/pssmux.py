@@ -5,10 +5,12 @@
 
 import os
 import io
-import glob
+import mmap
+import struct
 
 from shutil import copyfile
-from typing import BinaryIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import BinaryIO, cast
 
 
 audio_segment = b"\x00\x00\x01\xBD"
@@ -19,125 +21,231 @@ end_file = b"\x00\x00\x01\xB9"
 first_header_size = 0x3F
 header_size = 0x17
 
+# block id and block size
+block_header = struct.Struct(">4sH")
+
+
+class PssParser:
+    def __init__(self, file: BinaryIO):
+        self.file = file
+
+        # the size is only needed to detect a truncated stream, find it once and not once per audio block
+        pos = file.tell()
+        file.seek(0, os.SEEK_END)
+        self.size = file.tell()
+        file.seek(pos)
+
+        # size field of the last audio block found by seek_next_audio
+        self.block_size = 0
+
+    def seek_next_audio(self):
+        file = self.file
+
+        while True:
+            # block id and block size are read together
+            header = file.read(0x6)
+
+            if len(header) == 0x6:
+                block_id, b_size = block_header.unpack(header)
+            else:
+                block_id, b_size = header[:0x4], int.from_bytes(header[0x4:], "big")
+
+            if block_id == pack_start:
+                file.seek(0xA - 0x2, os.SEEK_CUR)
+            elif block_id == audio_segment:
+                self.block_size = b_size
+                return False
+            elif block_id == end_file or file.tell() - len(header[0x4:]) >= self.size:
+                # leave the stream right after the block id, as if only that was read
+                file.seek(-len(header[0x4:]), os.SEEK_CUR)
+                return True
+            else:
+                file.seek(b_size, os.SEEK_CUR)
+
+    def initial_audio_block(self):
+        file = self.file
+
+        file.seek(0x3B - 0x6, os.SEEK_CUR)
+
+        audio_total_size = int.from_bytes(file.read(0x4), "little")
+        data_size = self.block_size - first_header_size + 0x6
+
+        return audio_total_size, data_size
+
+    def audio_block(self):
+        self.file.seek(header_size - 0x6, os.SEEK_CUR)
+
+        data_size = self.block_size - header_size + 0x6
+
+        return data_size
+
+
+def stream_buffer(file: BinaryIO):
+    # the whole stream as a buffer, without a copy when it is already in memory
+    if isinstance(file, io.BytesIO):
+        # getvalue shares the bytes the BytesIO was created from, getbuffer would copy them first
+        return memoryview(file.getvalue())
+
+    if isinstance(file, mmap.mmap):
+        return memoryview(file)
+
+    if hasattr(file, "getbuffer"):
+        # e.g. a part of a memory map
+        return file.getbuffer()
 
-def seek_next_audio(file):
     pos = file.tell()
-    file.seek(0, os.SEEK_SET)
-    sz = file.seek(0, os.SEEK_END)
+    file.seek(0)
+    data = file.read()
     file.seek(pos)
 
-    while True:
-        block_id = file.read(0x4)
+    return memoryview(data)
+
+
+def audio_ranges(data: memoryview, pos=0):
+    # (offset, size) of the audio data of every audio block, found by walking the blocks with plain offsets on the
+    # buffer (the same walk as PssParser, without a read or a seek per block)
+    size = len(data)
+    ranges: list[tuple[int, int]] = []
+
+    while pos + 0x6 <= size:
+        block_id, b_size = block_header.unpack_from(data, pos)
 
         if block_id == pack_start:
-            file.seek(0xA, os.SEEK_CUR)
+            pos += 0xE
         elif block_id == audio_segment:
-            return False
+            if ranges:
+                data_start, data_size = pos + header_size, b_size - header_size + 0x6
+            else:
+                data_start, data_size = pos + first_header_size, b_size - first_header_size + 0x6
+
+            ranges.append((data_start, data_size))
+            pos = data_start + data_size
         elif block_id == end_file:
-            return True
-        elif file.tell() >= sz:
-            return True
+            return ranges
         else:
-            block_size = file.read(0x2)
-            file.seek(int.from_bytes(block_size, "big"), os.SEEK_CUR)
+            pos += 0x6 + b_size
 
+    # (a truncated last header has no audio data left after it)
+    return ranges
 
-def initial_audio_block(file):
-    b_size = int.from_bytes(file.read(0x2), "big")
 
-    file.seek(0x3B - 0x6, os.SEEK_CUR)
+def same_audio(source_data: memoryview, target_data: memoryview):
+    source_ranges = audio_ranges(source_data)
+    target_ranges = audio_ranges(target_data)
 
-    audio_total_size = int.from_bytes(file.read(0x4), "little")
-    data_size = b_size - first_header_size + 0x6
+    if not source_ranges or not target_ranges:
+        return False
 
-    return audio_total_size, data_size
+    # most movies already differ in their first audio block, only the others are compared in full
+    (source_start, source_size), (target_start, target_size) = source_ranges[0], target_ranges[0]
+    if source_data[source_start : source_start + source_size] != target_data[target_start : target_start + target_size]:
+        return False
 
+    def pieces(data, ranges):
+        # the audio data as views of the buffer: nothing is copied
+        views = (data[start : start + size] for start, size in ranges)
+        return [view for view in views if len(view)]
 
-def audio_block(file):
-    b_size = int.from_bytes(file.read(0x2), "big")
+    source_pieces = pieces(source_data, source_ranges)
+    target_pieces = pieces(target_data, target_ranges)
 
-    file.seek(-0x6, os.SEEK_CUR)
-    file.seek(header_size, os.SEEK_CUR)
+    if sum(map(len, source_pieces)) != sum(map(len, target_pieces)):
+        return False
 
-    data_size = b_size - header_size + 0x6
+    # the blocks of the two movies need not line up: both are walked together, one common length at a time, up to
+    # the first difference
+    source_iter, target_iter = iter(source_pieces), iter(target_pieces)
+    source_piece, target_piece = next(source_iter, None), next(target_iter, None)
 
-    return data_size
+    while source_piece is not None and target_piece is not None:
+        size = min(len(source_piece), len(target_piece))
 
+        if source_piece[:size] != target_piece[:size]:
+            return False
 
-def build_full_audio_buffer_io(file):
-    seek_next_audio(file)
-    total_size, curr_block_size = initial_audio_block(file)
-    buff = io.BytesIO()
-    buff.write(file.read(curr_block_size))
+        source_piece = source_piece[size:] or next(source_iter, None)
+        target_piece = target_piece[size:] or next(target_iter, None)
 
-    while True:
-        if seek_next_audio(file):
-            break
+    return True
 
-        curr_block_size = audio_block(file)
-        buff.write(file.read(curr_block_size))
 
-    file.seek(0)
-    buff.seek(0)
-    return buff
+def map_sequential(file: BinaryIO, access: int):
+    mapped = mmap.mmap(file.fileno(), 0, access=access)
+
+    # movies are walked from start to end: ask for a larger read ahead
+    if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+        try:
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+    return mapped
 
 
 def pss_mux(source: str, target: str, output: str):
+    # copyfile copies in the kernel (sendfile) where available
     copyfile(target, output)
-
-    with open(source, "rb") as source_file:
-        with open(output, "rb+") as target_file:
-            pss_mux_from_bytes_io(source_file, target_file)
+    pss_mux_inplace(source, output)
 
 
 def pss_mux_inplace(source: str, target: str):
-    with open(source, "rb") as source_file:
-        with open(target, "rb+") as target_file:
-            pss_mux_from_bytes_io(source_file, target_file)
+    # both movies are memory mapped: reads are served by the page cache and writes go straight into it
+    with open(source, "rb") as source_file, open(target, "rb+") as target_file:
+        with map_sequential(source_file, mmap.ACCESS_READ) as source_map:
+            with map_sequential(target_file, mmap.ACCESS_WRITE) as target_map:
+                with memoryview(source_map) as source_data, memoryview(target_map) as target_data:
+                    if same_audio(source_data, target_data):
+                        # muxing would write back the audio that is already there
+                        return
+
+                pss_mux_from_bytes_io(cast(BinaryIO, source_map), cast(BinaryIO, target_map))
 
 
 def pss_mux_in_memory(source: str, target: str):
-    with open(source, "rb") as source_file:
-        with open(target, "rb") as target_file:
-            target_buffer_io = io.BytesIO(target_file.read())
+    # the source is read through a map, the target is muxed into a copy of its own that the caller gets back
+    with open(source, "rb") as source_file, open(target, "rb") as target_file:
+        target_buffer_io = io.BytesIO(target_file.read())
 
-            pss_mux_from_bytes_io(source_file, target_buffer_io)
+        with map_sequential(source_file, mmap.ACCESS_READ) as source_map:
+            pss_mux_from_bytes_io(cast(BinaryIO, source_map), target_buffer_io)
 
-            target_buffer_io.seek(0)
-            return target_buffer_io
+        target_buffer_io.seek(0)
+        return target_buffer_io
 
 
 def pss_mux_from_bytes_io(source_io: BinaryIO, target_io: BinaryIO):
     total_buffer_written = 0x0
-    source_full_buff_io = build_full_audio_buffer_io(source_io)
 
-    seek_next_audio(target_io)
-    seek_next_audio(source_io)
+    # the source is only walked once: its audio data, and the number of its audio blocks (which is all that is left
+    # to know of the source while the target is walked)
+    with stream_buffer(source_io) as source_data:
+        source_ranges = audio_ranges(source_data, source_io.tell())
+        source_audio = memoryview(b"".join(source_data[start : start + size] for start, size in source_ranges))
+
+    source_io.seek(0)
+    source_blocks_left = len(source_ranges) - 1
 
-    target_total_size, target_curr_block_size = initial_audio_block(target_io)
-    source_total_size, source_curr_block_size = initial_audio_block(source_io)
+    target_parser = PssParser(target_io)
 
-    source_io.seek(source_curr_block_size, os.SEEK_CUR)
+    target_parser.seek_next_audio()
+    target_total_size, target_curr_block_size = target_parser.initial_audio_block()
 
-    data = source_full_buff_io.read(target_curr_block_size)
-    target_io.write(data)
+    # slices of the source audio are written as they are, without a copy per block
+    target_io.write(source_audio[total_buffer_written : total_buffer_written + target_curr_block_size])
 
     total_buffer_written += target_curr_block_size
 
     while True:
-        target_done = seek_next_audio(target_io)
-        source_done = seek_next_audio(source_io)
+        target_done = target_parser.seek_next_audio()
 
-        if target_done or source_done:
+        if target_done or source_blocks_left <= 0:
             break
 
-        target_curr_block_size = audio_block(target_io)
-        source_curr_block_size = audio_block(source_io)
+        source_blocks_left -= 1
 
-        source_io.seek(source_curr_block_size, os.SEEK_CUR)
+        target_curr_block_size = target_parser.audio_block()
 
-        data = source_full_buff_io.read(target_curr_block_size)
-        target_io.write(data)
+        target_io.write(source_audio[total_buffer_written : total_buffer_written + target_curr_block_size])
 
         total_buffer_written += target_curr_block_size
 
@@ -146,24 +254,79 @@ def pss_mux_from_bytes_io(source_io: BinaryIO, target_io: BinaryIO):
     return return_value
 
 
-def parse_all_videos(jp_path, en_path, out_path):
-    jp_video_movie = [f for f in glob.glob(os.path.join(jp_path, "MOVIE", "*.*")) if f.upper().endswith(".PSS")]
-    jp_video_movie2 = [f for f in glob.glob(os.path.join(jp_path, "MOVIE2", "*.*")) if f.upper().endswith(".PSS")]
+def list_pss(directory: str):
+    # one directory read, names are tested as they are (no stat per entry and no full path to match); hidden files
+    # are skipped, as glob did
+    try:
+        with os.scandir(directory) as entries:
+            return [
+                entry.path
+                for entry in entries
+                if entry.name[-4:].upper() == ".PSS" and not entry.name.startswith(".") and not entry.is_dir()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def will_need(path: str):
+    if not hasattr(os, "posix_fadvise"):
+        return
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _mux_movie(task: "tuple[str, str, str]"):
+    jp_movie, en_movie, out_movie = task
+
+    os.makedirs(os.path.dirname(out_movie), exist_ok=True)
+    pss_mux(jp_movie, en_movie, out_movie)
+    assert os.stat(en_movie).st_size == os.stat(out_movie).st_size
+
+    return out_movie
+
+
+def _copy_movie(task: "tuple[str, str]"):
+    en_movie, out_movie = task
+
+    os.makedirs(os.path.dirname(out_movie), exist_ok=True)
+    copyfile(en_movie, out_movie)
+
+    return out_movie
+
+
+def parse_all_videos(jp_path, en_path, out_path, max_workers=None):
+    jp_video_movie = list_pss(os.path.join(jp_path, "MOVIE"))
+    jp_video_movie2 = list_pss(os.path.join(jp_path, "MOVIE2"))
+
+    en_video_movie = list_pss(os.path.join(en_path, "MOVIE"))
+    en_video_movie2 = list_pss(os.path.join(en_path, "MOVIE2"))
+    en_video_movie3 = list_pss(os.path.join(en_path, "MOVIE3"))
+    en_video_movie4 = list_pss(os.path.join(en_path, "MOVIE4"))
 
-    en_video_movie = [f for f in glob.glob(os.path.join(en_path, "MOVIE", "*.*")) if f.upper().endswith(".PSS")]
-    en_video_movie2 = [f for f in glob.glob(os.path.join(en_path, "MOVIE2", "*.*")) if f.upper().endswith(".PSS")]
-    en_video_movie3 = [f for f in glob.glob(os.path.join(en_path, "MOVIE3", "*.*")) if f.upper().endswith(".PSS")]
-    en_video_movie4 = [f for f in glob.glob(os.path.join(en_path, "MOVIE4", "*.*")) if f.upper().endswith(".PSS")]
+    en_video_movie5 = list_pss(os.path.join(en_path, "MOVIE5"))
 
-    en_video_movie5 = [f for f in glob.glob(os.path.join(en_path, "MOVIE5", "*.*")) if f.upper().endswith(".PSS")]
+    def basename(p):
+        return os.path.splitext(os.path.basename(p))[0].rstrip("p")
 
     def find_matches(_jp_list, _en_list):
-        def basename(p):
-            return os.path.splitext(os.path.basename(p))[0].rstrip("p")
+        # first en movie of each name, then one lookup per jp movie
+        en_by_name = dict()
+        for _en_movie in _en_list:
+            en_by_name.setdefault(basename(_en_movie), _en_movie)
 
         matches = list()
         for _jp_movie in _jp_list:
-            en_match = next((_en_movie for _en_movie in _en_list if basename(_en_movie) == basename(_jp_movie)), None)
+            en_match = en_by_name.get(basename(_jp_movie))
             if en_match:
                 matches.append((_jp_movie, en_match))
 
@@ -178,18 +341,37 @@ def parse_all_videos(jp_path, en_path, out_path):
     def basedir(p):
         return os.path.basename(os.path.dirname(p))
 
-    def st_size(f):
-        return os.stat(f).st_size
-
-    for jp_movie, en_movie in matches_movie + matches_movie_p + matches_movie2 + matches_movie2_p:
-        out_movie = os.path.join(out_path, basedir(en_movie), os.path.basename(en_movie))
-        os.makedirs(os.path.dirname(out_movie), exist_ok=True)
-        pss_mux(jp_movie, en_movie, out_movie)
-        print(out_movie)
-        assert st_size(en_movie) == st_size(out_movie)
-
-    for en_movie in en_video_movie5:
-        out_movie = os.path.join(out_path, basedir(en_movie), os.path.basename(en_movie))
-        os.makedirs(os.path.dirname(out_movie), exist_ok=True)
-        print(out_movie)
-        copyfile(en_movie, out_movie)
+    if max_workers is None:
+        # half of the cores: every mux also keeps the disk busy
+        max_workers = max(1, (os.cpu_count() or 1) // 2)
+
+    mux_tasks = [
+        (jp_movie, en_movie, os.path.join(out_path, basedir(en_movie), os.path.basename(en_movie)))
+        for jp_movie, en_movie in matches_movie + matches_movie_p + matches_movie2 + matches_movie2_p
+    ]
+    copy_tasks = [
+        (en_movie, os.path.join(out_path, basedir(en_movie), os.path.basename(en_movie)))
+        for en_movie in en_video_movie5
+    ]
+
+    # largest movies first, so that the last ones to finish are small and no worker is left alone with a big one
+    mux_tasks.sort(key=lambda task: os.stat(task[1]).st_size, reverse=True)
+
+    # the movies of the next tasks are read ahead in the page cache while the current ones are muxed
+    prefetch = 2 * max_workers
+    for jp_movie, en_movie, _ in mux_tasks[:prefetch]:
+        will_need(jp_movie)
+        will_need(en_movie)
+
+    # movies are independent from each other: mux them in parallel processes, and copy the others in threads
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for n, out_movie in enumerate(executor.map(_mux_movie, mux_tasks)):
+            print(out_movie)
+
+            if n + prefetch < len(mux_tasks):
+                will_need(mux_tasks[n + prefetch][0])
+                will_need(mux_tasks[n + prefetch][1])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for out_movie in executor.map(_copy_movie, copy_tasks):
+            print(out_movie)
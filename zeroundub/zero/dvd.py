@@ -2,26 +2,37 @@ from contextlib import contextmanager
 
 import pycdlib
 
+from pycdlib.pycdlibio import PyCdlibIO
+
 
 class CDDVD:
     def __init__(self, iso_path: str):
         self.iso = pycdlib.PyCdlib()
         self.iso.open(iso_path, mode="rb")
+        self._is_open = True
         self.iso9660_facade = self.iso.get_iso9660_facade()
 
+        # iso name to directory record, from a single listing of the root directory
+        self.records = {
+            record.file_identifier().decode("utf-8"): record
+            for record in self.iso9660_facade.list_children("/")
+            if record.is_file()
+        }
+
         # name to iso name (e.g. README.TXT -> README.TXT;1)
-        self.files = {file_name.rsplit(";", 1)[0]: file_name for file_name in next(self.iso9660_facade.walk("/"))[2]}
+        self.files = {file_name.rsplit(";", 1)[0]: file_name for file_name in self.records}
 
     def find_file(self, file_name: str):
-        upper_name = file_name.upper()
+        # names are usually given in upper case already: try them as they are before making an upper case copy
+        iso_name = self.files.get(file_name) or self.files.get(file_name.upper())
 
-        if upper_name in self.files:
-            file_name = self.files[upper_name]
+        if iso_name is not None:
+            return iso_name
 
-        elif file_name not in self.files.values():
-            return None
+        if file_name in self.records:
+            return file_name
 
-        return file_name
+        return None
 
     def read_file(self, file_name: str, size=-1, offset=0):
         try:
@@ -38,16 +49,46 @@ class CDDVD:
         if not _file_name:
             raise FileNotFoundError(file_name)
 
-        with self.iso9660_facade.open_file_from_iso(f"/{_file_name}") as file_h:
+        inode = getattr(self.records[_file_name], "inode", None)
+
+        if inode is None:
+            with self.iso9660_facade.open_file_from_iso(f"/{_file_name}") as file_h:
+                yield file_h
+            return
+
+        # the record is already known: open its data directly, without walking the directory tree for the path again
+        with PyCdlibIO(inode, self.iso.logical_block_size) as file_h:
             yield file_h
 
+    def get_file_extent(self, file_name: str):
+        # the iso file and the offset of the data of file_name in it
+        iso_name = self.find_file(file_name)
+        iso_fh = getattr(self.iso, "_cdfp", None)
+
+        if iso_name is None or iso_fh is None:
+            return None
+
+        return iso_fh, self.records[iso_name].fp_offset
+
     def get_file_size(self, file_name):
         file_name = self.find_file(file_name)
 
         if file_name is None:
             return None
 
-        return self.iso9660_facade.get_record(f"/{file_name}").get_data_length()
+        return self.records[file_name].get_data_length()
+
+    def close(self):
+        # pycdlib refuses to close an iso twice
+        if getattr(self, "_is_open", False):
+            self._is_open = False
+            self.iso.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
 
-    def __delete__(self, instance):
-        self.iso.close()
+    def __del__(self):
+        self.close()
@@ -1 +1,7 @@
-from .repack import check_iso_hashes, replace_movies_in_iso_inplace, patch_elf_inplace, merge_iso_img_bd_contents
+from .repack import (
+    check_iso_hashes,
+    replace_movies_in_iso_inplace,
+    patch_elf_inplace,
+    merge_iso_img_bd_contents,
+    get_img_bd_extent,
+)
@@ -1,4 +1,5 @@
 from io import BytesIO
+from typing import BinaryIO
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
 
@@ -34,6 +35,13 @@ class AbstractAdapter(ABC):
         self.img_hd_path = None
         self.img_bd_path = None
 
+    def close(self):
+        pass
+
+    def get_file_extent(self, file_name: str) -> "tuple[BinaryIO, int] | None":
+        # the os file holding the data of file_name as it is, and where the data starts in it (if there is one)
+        return None
+
     def setup(self):
         if not getattr(self, "_init_called", False):
             raise RuntimeError("must call __init__ of super class")
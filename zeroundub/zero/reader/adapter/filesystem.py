@@ -7,31 +7,62 @@ from .abstract import AbstractAdapter
 
 
 class FilesystemAdapter(AbstractAdapter):
+    def __init__(self, load_path: str):
+        super().__init__(load_path)
+
+        # every file is opened once and shared by all the reads of it (reads use pread, so they do not
+        # share the file position)
+        self._handles: dict[str, BinaryIO] = {}
+
+        # the folder is listed once: upper case name to path of every file in it (the first one of each name)
+        self._files: dict[str, str] = {}
+        for file_name in next(os.walk(load_path), (load_path, [], []))[2]:
+            self._files.setdefault(file_name.upper(), os.path.join(load_path, file_name))
+
+    def _get_handle(self, file_name: str) -> BinaryIO:
+        file_h = self._handles.get(file_name)
+
+        if file_h is None:
+            file_h = open(file_name, "rb")  # pylint: disable=consider-using-with
+            self._handles[file_name] = cast(BinaryIO, file_h)
+
+        return file_h
+
+    def close(self):
+        for file_h in self._handles.values():
+            file_h.close()
+
+        self._handles.clear()
+
+    def __del__(self):
+        self.close()
+
+    def get_file_extent(self, file_name: str) -> "tuple[BinaryIO, int] | None":
+        return self._get_handle(file_name), 0
+
     def test_file(self, file_path: str) -> bool:
         return os.path.isfile(file_path) and os.access(file_path, os.R_OK)
 
     def read_file(self, file_name: str, size=-1, offset=0) -> bytes:
-        with self.open(file_name) as file_h:
-            file_h = cast(BinaryIO, file_h)
-            file_h.seek(offset)
-            return file_h.read(size)
+        file_h = self._get_handle(file_name)
+        available = max(0, os.fstat(file_h.fileno()).st_size - offset)
+        size = available if size < 0 else min(size, available)
+
+        # a single positional read of just the requested bytes, instead of seek and read on the shared handle
+        if hasattr(os, "pread"):
+            return os.pread(file_h.fileno(), size, offset)
+
+        file_h.seek(offset)
+        return file_h.read(size)
 
     def get_img_bd_size(self) -> int:
         assert self.img_bd_path is not None
         return os.stat(self.img_bd_path).st_size
 
     def find_file(self, file_name: str) -> "str | None":
-        all_files = next(os.walk(self.load_path))[2]
-        file_name_upper = file_name.upper()
-        file_match_gen = (file_name for file_name in all_files if file_name.upper() == file_name_upper)
-        file_name_match = next(file_match_gen, None)
-
-        if file_name_match is not None:
-            file_name_match = os.path.join(self.load_path, file_name_match)
-
-        return file_name_match
+        return self._files.get(file_name.upper())
 
     @contextmanager
     def open(self, file_name: str) -> BinaryIO:  # pyright: ignore[reportGeneralTypeIssues]
-        with open(file_name, "rb") as file_h:
-            yield cast(BinaryIO, file_h)
+        # the shared handle stays open until the adapter is closed
+        yield self._get_handle(file_name)
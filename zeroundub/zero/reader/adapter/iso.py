@@ -15,12 +15,18 @@ class ISOAdapter(AbstractAdapter):
         except (IsADirectoryError, PermissionError, FileNotFoundError, PyCdlibInvalidISO):
             raise RuntimeError("cannot open iso")  # pylint: disable=raise-missing-from
 
+    def close(self):
+        self.iso.close()
+
     def test_file(self, file_path: str) -> bool:
         return bool(self.iso.find_file(file_path))
 
     def read_file(self, file_name: str, size=-1, offset=0) -> "bytes | None":
         return self.iso.read_file(file_name, size, offset)
 
+    def get_file_extent(self, file_name: str) -> "tuple[BinaryIO, int] | None":
+        return self.iso.get_file_extent(file_name)
+
     def get_img_bd_size(self) -> "int | None":
         return self.iso.get_file_size(self.img_bd_path)
 
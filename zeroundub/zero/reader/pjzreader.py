@@ -10,12 +10,16 @@ from .adapter import FilesystemAdapter, ISOAdapter
 from ...utils.file import SubFile
 
 
+img_hd_entry = struct.Struct("<2I")
+
+
 def is_iso_file(file_path):
     return os.path.isfile(file_path) and os.path.splitext(file_path)[1].upper() == ".ISO"
 
 
 class PJZReader:
-    re_dat_entry = re.compile(r"([A-Z0-9_]+)_([A-Z0-9]+):([0-9]+)")
+    # an entry of CD_FILE_DAT, only at the start of the list or right after a comma
+    re_dat_entry = re.compile(rb"(?<![^,])([A-Z0-9_]+)_([A-Z0-9]+):([0-9]+)")
 
     def __init__(self, load_path):
         self.load_path = load_path
@@ -48,20 +52,21 @@ class PJZReader:
         except ValueError:
             return None
 
-        cd_file_dat = cd_file_dat.replace(b"\x2C\x5C\x00", b"\x2C").decode("ascii")
-        section_name, file_list = cd_file_dat.split("=e", 1)
+        cd_file_dat = cd_file_dat.replace(b"\x2C\x5C\x00", b"\x2C")
+        section_name, file_list = cd_file_dat.split(b"=e", 1)
 
-        file_list = file_list.rstrip(",").split(",")
+        file_list = file_list.rstrip(b",")
 
-        entry_matches = [self.re_dat_entry.match(entry) for entry in file_list]
+        # the whole list is scanned at once, on the bytes as they are: every entry must match, i.e. there must be
+        # one match per entry
+        entry_matches = list(self.re_dat_entry.finditer(file_list))
 
-        if not all(entry_matches):
+        if len(entry_matches) != file_list.count(b",") + 1:
             return None
 
-        entry_matches = cast(list[re.Match[str]], entry_matches)
-
         toc_entry_list = [
-            TOCEntry(f"{entry.group(1)}.{entry.group(2)}", int(entry.group(3))) for entry in entry_matches
+            TOCEntry(f"{entry.group(1).decode()}.{entry.group(2).decode()}", int(entry.group(3)))
+            for entry in entry_matches
         ]
 
         return toc_entry_list
@@ -75,10 +80,8 @@ class PJZReader:
         if len(img_hd_bin) % 8 != 0:
             return None
 
-        num_int32 = len(img_hd_bin) // 4
-        file_data = struct.unpack(f"<{num_int32}I", img_hd_bin)
-
-        file_entry_list = [FileEntry(file_data[i] * 0x800, file_data[i + 1]) for i in range(0, len(file_data), 2)]
+        # (offset in sectors, size) pairs, unpacked one pair at a time without a tuple of the whole table
+        file_entry_list = [FileEntry(offset * 0x800, size) for offset, size in img_hd_entry.iter_unpack(img_hd_bin)]
 
         return file_entry_list
 
@@ -128,6 +131,20 @@ class PJZReader:
 
         return self.adapter.read_file(self.adapter.img_bd_path, size, toc_entry.offset + offset)
 
+    def get_entry_extent(self, file_name) -> "tuple[BinaryIO, int, int] | None":
+        # the os file holding the data of file_name as it is, where the data starts in it and its size
+        assert self.adapter.img_bd_path is not None
+
+        toc_entry = self.find_entry(file_name)
+        img_bd_extent = self.adapter.get_file_extent(self.adapter.img_bd_path)
+
+        if toc_entry is None or img_bd_extent is None:
+            return None
+
+        img_bd_h, img_bd_offset = img_bd_extent
+
+        return img_bd_h, img_bd_offset + toc_entry.offset, toc_entry.size
+
     @contextmanager
     def open(self, file_name):
         assert self.adapter.img_bd_path is not None
@@ -168,6 +185,15 @@ class PJZReader:
     def make_file_name_index(self) -> dict[str, TOCEntry]:
         return {entry.name: entry for entry in self.toc_entry_list}
 
+    def close(self):
+        self.adapter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
     def __repr__(self):
         return (
             f"{self.__class__.__name__}[{self.adapter.__class__.__name__}="
@@ -2,12 +2,57 @@ import io
 import os
 import re
 import struct
+import bisect
 
 from abc import ABC, abstractmethod
 from typing import BinaryIO
 
 from .tables.subtitles import decode_english_subtitles
-from .tables import table_eu, table_jp, LASTCH, COLOR, NEWLINE
+from .tables import table_eu, table_jp, encoding_eu, encoding_jp, LASTCH, COLOR, NEWLINE
+
+
+# patterns used for every message, compiled once
+RE_SUFFIX = re.compile(b"^(.*?)(\xFA?\xFF*)$", re.DOTALL)
+RE_COLOR = re.compile(r"{Color#([A-F0-9]{2})([A-F0-9]{2})([A-F0-9]{2})}")
+RE_CHARACTER = re.compile(r"({0x[A-F0-9]{2}}|{.*?}|.)")
+
+COLOR_REPLACEMENT = f"{{0x{COLOR:02X}}}{{0x\\1}}{{0x\\2}}{{0x\\3}}"
+
+# one table offset
+dword = struct.Struct("<I")
+
+# 1 for the bytes that select a japanese font table, 0 for any other byte
+JP_MASK = bytes(1 if x in table_jp else 0 for x in range(256))
+
+
+def make_decoding(font_table, japanese: bool):
+    # the text of every byte on its own, and a pattern for the bytes that are decoded together with the ones after
+    # them (colors and, in japanese, the bytes that select a font table)
+    characters: "list[str | None]" = [font_table["default"][x] if x <= LASTCH else f"{{0x{x:02X}}}" for x in range(256)]
+    characters[NEWLINE] = "\n"
+
+    special = [COLOR] + ([x for x in font_table if isinstance(x, int)] if japanese else [])
+    for x in special:
+        characters[x] = None
+
+    return tuple(characters), re.compile(b"[" + b"".join(re.escape(bytes([x])) for x in special) + b"]")
+
+
+DECODING_EU = make_decoding(table_eu, japanese=False)
+DECODING_JP = make_decoding(table_jp, japanese=True)
+
+
+def make_token_encoding(encoding: "dict[str, bytes]"):
+    # the bytes of every token the encoder can find in a message: tokens of 6 characters are always a raw byte
+    # ({0xNN}), whatever is in the font tables
+    token_encoding = {token: enc for token, enc in encoding.items() if len(token) != 6}
+    token_encoding.update({f"{{0x{x:02X}}}": bytes([x]) for x in range(256)})
+
+    return token_encoding
+
+
+TOKENS_EU = make_token_encoding(encoding_eu)
+TOKENS_JP = make_token_encoding(encoding_jp)
 
 
 class Serializable(ABC):
@@ -64,33 +109,32 @@ class InGameMessageTable(Serializable):
             return self.messages[item]
 
     def has_overlap(self, other):
-        r1 = range(self.offset, self.offset + self.size)
-        r2 = range(other.offset, other.offset + other.size)
-        return len(list(set(r1) & set(r2))) != 0
+        # two non empty byte ranges overlap when each one starts before the other one ends
+        return (
+            self.size > 0
+            and other.size > 0
+            and self.offset < other.offset + other.size
+            and other.offset < self.offset + self.size
+        )
 
     def encode(self, offset=0):
         table = self.tables if self.tables else self.messages
 
-        encoded = io.BytesIO()
+        # room for the offsets first, filled in once the entries are encoded
+        encoded = bytearray(len(table) * 4)
         offsets = []
 
-        encoded.write(bytearray(len(table * 4)))
         offset += len(table) * 4
 
         for entry in table:
             offsets.append(offset)
             enc = entry.encode(offset)
-            encoded.write(enc)
+            encoded += enc
             offset += len(enc)
 
-        encoded.seek(0, os.SEEK_SET)
-
-        table_bin = struct.pack(f"<{len(offsets)}I", *offsets)
-        encoded.write(table_bin)
+        struct.pack_into(f"<{len(offsets)}I", encoded, 0, *offsets)
 
-        encoded.seek(0, os.SEEK_SET)
-
-        return encoded.read()
+        return bytes(encoded)
 
 
 class InGameMessage(Serializable):
@@ -125,12 +169,11 @@ class InGameMessage(Serializable):
 
     @staticmethod
     def _maybe_japanese(data):
-        has_jp_symbols_iter = (True for x in data if x in table_jp)
-        return next(has_jp_symbols_iter, False)
+        return b"\x01" in data.translate(JP_MASK)
 
     @staticmethod
     def _separate_suffix(data: bytes) -> tuple[bytes, bytes]:
-        match = re.match(b"^(.*?)(\xFA?\xFF*)$", data, re.DOTALL)
+        match = RE_SUFFIX.match(data)
         assert match is not None
         data, suffix = match.groups()
         return data, suffix
@@ -151,43 +194,44 @@ class InGameMessage(Serializable):
             self.japanese = self._maybe_japanese(text_bin)
 
         font_table = table_eu if not self.japanese else table_jp
+        characters, re_special = DECODING_EU if not self.japanese else DECODING_JP
+
+        parts: list[str] = []
 
         idx = 0
         while idx < len(text_bin):
+            # the bytes up to the next color or font table switch are decoded one by one, with a lookup each
+            match = re_special.search(text_bin, idx)
+            end = match.start() if match is not None else len(text_bin)
+            parts.extend(map(characters.__getitem__, text_bin[idx:end]))  # pyright: ignore[reportGeneralTypeIssues]
+
+            if match is None:
+                break
+
+            idx = end
             x = text_bin[idx]
 
             if x == COLOR:
                 idx_left = len(text_bin) - 1 - idx
                 if idx_left >= 3:
                     # pylint: disable=consider-using-f-string
-                    self.message += "{Color#%02X%02X%02X}" % (text_bin[idx + 1], text_bin[idx + 2], text_bin[idx + 3])
+                    parts.append("{Color#%02X%02X%02X}" % (text_bin[idx + 1], text_bin[idx + 2], text_bin[idx + 3]))
                     idx += 3
                 else:
-                    self.message += "{Color}"
-
-            elif x == NEWLINE:
-                self.message += "\n"
+                    parts.append("{Color}")
 
-            elif self.japanese and x in font_table:
+            else:
                 table = font_table[x]
                 idx += 1
-                self.message += table[text_bin[idx]]
-
-            elif x <= LASTCH:
-                self.message += font_table["default"][x]
-
-            else:
-                self.message += f"{{0x{x:02X}}}"
+                parts.append(table[text_bin[idx]])
 
             idx += 1
 
+        self.message += "".join(parts)
+
     @staticmethod
     def _encode_color(color_str):
-        return re.sub(
-            r"{Color#([A-F0-9]{2})([A-F0-9]{2})([A-F0-9]{2})}",
-            f"{{0x{COLOR:02X}}}{{0x\\1}}{{0x\\2}}{{0x\\3}}",
-            color_str,
-        )
+        return RE_COLOR.sub(COLOR_REPLACEMENT, color_str)
 
     def encode(self, offset=0):
         message = (
@@ -196,32 +240,25 @@ class InGameMessage(Serializable):
             .replace("\n", f"{{0x{NEWLINE:02X}}}")
         )
 
-        encoded = io.BytesIO()
+        char_encoding = TOKENS_JP if self.japanese is True else TOKENS_EU
 
-        char_table = table_jp if self.japanese is True else table_eu
+        parts: list[bytes] = []
 
-        characters = re.findall(r"({0x[A-F0-9]{2}}|{.*?}|.)", message)
+        characters = RE_CHARACTER.findall(message)
         for ch in characters:
-            enc = None
-            if len(ch) != 6:
-                for name, table in char_table.items():
-                    if ch in table:
-                        enc = table.index(ch).to_bytes(1, "little")
-                    if enc is not None and name != "default" and isinstance(name, int):
-                        enc = name.to_bytes(1, "little") + enc
-                    if enc is not None:
-                        break
-            else:
+            enc = char_encoding.get(ch)
+
+            # (other raw bytes, e.g. in lower case)
+            if enc is None and len(ch) == 6:
                 enc = bytes.fromhex(ch[3:5])
 
             assert enc is not None
 
-            encoded.write(enc)
+            parts.append(enc)
 
-        encoded.write(self.suffix)
+        parts.append(self.suffix)
 
-        encoded.seek(0, os.SEEK_SET)
-        encoded = encoded.read()
+        encoded = b"".join(parts)
         encoded_hex_str = " ".join(f"{x:02X}" for x in encoded)
 
         self.data, self.suffix = self._separate_suffix(encoded)
@@ -244,31 +281,41 @@ class InGameMessage(Serializable):
             return id(self) == id(other)
 
     def has_overlap(self, other):
-        r1 = range(self.offset, self.offset + self.size)
-        r2 = range(other.offset, other.offset + other.size)
-        return len(list(set(r1) & set(r2))) != 0
+        # two non empty byte ranges overlap when each one starts before the other one ends
+        return (
+            self.size > 0
+            and other.size > 0
+            and self.offset < other.offset + other.size
+            and other.offset < self.offset + self.size
+        )
 
 
 class InGameMessageParser:
     def __init__(self, file: "str | bytes | BinaryIO", table_names: "list[str] | None" = None, japanese=False):
         if isinstance(file, str):
             with open(file, "rb") as fh:
-                self.file_h = io.BytesIO(fh.read())
+                data = fh.read()
         elif isinstance(file, bytes):
-            self.file_h = io.BytesIO(file)
+            data = file
+        elif isinstance(file, io.BytesIO):
+            data = file.getvalue()
         elif isinstance(file, io.IOBase):
             pos = file.tell()
             file.seek(0, os.SEEK_SET)
-            self.file_h = io.BytesIO(file.read())
+            data = file.read()
             file.seek(pos, os.SEEK_SET)
         else:
             raise ValueError("input must be filename or open file handle")
 
-        self.file_size = self.file_h.getbuffer().nbytes
+        # the BytesIO shares the bytes it is created from, as long as it is only read (getbuffer would copy them)
+        self._data = data
+        self.file_h = io.BytesIO(data)
+        self.file_size = len(data)
         self.japanese = japanese
 
         self._boundaries: list[int] = []
-        self._byte_address_read = []
+        # (start, end) of every byte range read as a table or as a message
+        self._byte_address_read: list[tuple[int, int]] = []
 
         self.msg_tables = self._parse_obj(japanese=japanese)
 
@@ -287,12 +334,9 @@ class InGameMessageParser:
         table_idx = self.table_names.index(item)
         return self.msg_tables.tables[table_idx]
 
-    @staticmethod
-    def _read_dword(f):
-        return struct.unpack("<I", f.read(4))[0], f.tell()
-
     def next_boundary(self, offset):
-        return next(b for b in self._boundaries if b > offset)
+        # boundaries are sorted (and unique) once parsed: binary search for the first one after offset
+        return self._boundaries[bisect.bisect_right(self._boundaries, offset)]
 
     def _parse_obj_rec(self, msg_table: InGameMessageTable):
         file_has_table = len(msg_table.tables) > 0
@@ -305,59 +349,81 @@ class InGameMessageParser:
 
         for message in msg_table.messages:
             size = self.next_boundary(message.offset) - message.offset
-            addresses = [x for x in range(message.offset, message.offset + message.size)]
-            self._byte_address_read.extend(addresses)
             message.parse_text(self.file_h, size)
+            self._byte_address_read.append((message.offset, message.offset + message.size))
             message.encode()
 
     def _find_table_size(self, offset):
         max_offset = self.file_size
-        position = -1
         maybe_table = []
-        address_read = []
-        while max_offset > position:
-            address_read.extend([x for x in range(self.file_h.tell(), self.file_h.tell() + 4)])
-            if self.file_h.tell() + 4 >= self.file_size:
-                return False, 0
-            address, position = self._read_dword(self.file_h)
-            max_offset = min(address, max_offset)
-            if address > self.file_size or max_offset < offset:
+
+        # the first address is as far as the table can go: that dword is read on its own, then all the others up to
+        # there are unpacked at once (and checked one by one, in order)
+        position = offset
+        batch = 1
+        while True:
+            # only dwords that end before the end of the file can be read
+            count = min(batch, max(0, (self.file_size - 1 - position) // 4))
+
+            if count == 0:
                 return False, 0
-            maybe_table.append(address)
-        self._byte_address_read.extend(address_read)
-        return maybe_table, max_offset - offset
+
+            for (address,) in dword.iter_unpack(self._data[position : position + count * 4]):
+                position += 4
+                max_offset = min(address, max_offset)
+
+                if address > self.file_size or max_offset < offset:
+                    return False, 0
+
+                maybe_table.append(address)
+
+                if max_offset <= position:
+                    self._byte_address_read.append((offset, position))
+                    return maybe_table, max_offset - offset
+
+            batch = (max_offset - position + 3) // 4
 
     def _parse_obj_tables(
         self, number, offset=0, msg_table: "InGameMessageTable | None" = None, japanese: "bool | None" = False
     ):
-        self.file_h.seek(offset, os.SEEK_SET)
+        root_msg_table = None
 
-        table, tbl_size = self._find_table_size(offset)
+        # entries still to parse, depth first and in file order: number, offset, parent table and whether the entry
+        # is a message of its parent when it is not a table (the first one is not)
+        stack: "list[tuple[int, int, InGameMessageTable | None, bool]]" = [(number, offset, msg_table, False)]
 
-        if table is False:
-            return
+        while stack:
+            number, offset, msg_table, in_table = stack.pop()
+
+            table, tbl_size = self._find_table_size(offset)
+
+            if table is False:
+                if in_table:
+                    assert msg_table is not None
+                    msg_table.add_message(InGameMessage(number, offset, msg_table, japanese))
+                    self._boundaries.append(offset)
+
+                continue
+
+            cur_msg_table = InGameMessageTable(number, offset, tbl_size, msg_table)
+            self._boundaries.append(offset)
 
-        cur_msg_table = InGameMessageTable(number, offset, tbl_size, msg_table)
-        self._boundaries.append(offset)
+            if msg_table is not None:
+                msg_table.add_table(cur_msg_table)
 
-        if msg_table is not None:
-            msg_table.add_table(cur_msg_table)
+            if not in_table:
+                root_msg_table = cur_msg_table
 
-        for n, offset_start in enumerate(table):
-            has_subtable = self._parse_obj_tables(n, offset_start, cur_msg_table, japanese) is not None
-            if not has_subtable:
-                cur_msg_table.add_message(InGameMessage(n, offset_start, cur_msg_table, japanese))
-                self._boundaries.append(offset_start)
+            stack.extend((n, offset_start, cur_msg_table, True) for n, offset_start in reversed(list(enumerate(table))))
 
-        return cur_msg_table
+        return root_msg_table
 
     def _parse_obj(self, japanese: "bool | None" = None):
         msg_tables = self._parse_obj_tables(number=0, japanese=japanese)
         assert msg_tables is not None
 
         self._boundaries.append(self.file_size)
-        self._boundaries = list(set(self._boundaries))
-        self._boundaries.sort()
+        self._boundaries = sorted(set(self._boundaries))
 
         for table in msg_tables.tables:
             self._parse_obj_rec(table)
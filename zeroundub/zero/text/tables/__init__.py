@@ -1,7 +1,11 @@
 from .european import table_eu
 from .japanese import table_jp
+from .utils import make_encoding
 
 
 LASTCH = 0xD1
 COLOR = 0xFD
 NEWLINE = 0xFE
+
+encoding_eu = make_encoding(table_eu)
+encoding_jp = make_encoding(table_jp)
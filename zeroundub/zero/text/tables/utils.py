@@ -13,4 +13,18 @@ def make_table(font):
 
     assert len(table) == 21 * 10
 
-    return table
+    # the tables are only read, never changed
+    return tuple(table)
+
+
+def make_encoding(tables):
+    # character to its encoded bytes, from the first table that has it (as a search through the tables in order)
+    encoding: dict[str, bytes] = {}
+
+    for name, table in tables.items():
+        prefix = name.to_bytes(1, "little") if name != "default" and isinstance(name, int) else b""
+
+        for n, x in enumerate(table):
+            encoding.setdefault(x, prefix + n.to_bytes(1, "little"))
+
+    return encoding
@@ -1,6 +1,4 @@
 import os
-import io
-import scipy
 import struct
 import numpy as np
 
@@ -8,6 +6,10 @@ from typing import Union, BinaryIO
 from functools import lru_cache
 
 
+# file header (signature, version, number of images, padding) and image header, packed at once
+tim2_header = struct.Struct("<4sHH8xIIIHHBBBBHHQQII")
+
+
 class InvalidTim2FormatException(Exception):
     pass
 
@@ -115,29 +117,30 @@ class Tim2Image:
 
     def to_bytes(self):
         assert self.image and self.image.data and self.image.palette
-        out_handle = io.BytesIO()
-        out_handle.write(b"TIM2")
-        out_handle.write(struct.pack("<H", self.version))
-        out_handle.write(struct.pack("<H", self.num_images))
-        out_handle.write(b"\x00" * 8)
-        out_handle.write(struct.pack("<I", self.image.total_length))
-        out_handle.write(struct.pack("<I", self.image.palette_length))
-        out_handle.write(struct.pack("<I", self.image.data_length))
-        out_handle.write(struct.pack("<H", self.image.header_length))
-        out_handle.write(struct.pack("<H", self.image.color_entries))
-        out_handle.write(struct.pack("<B", self.image.image_format))
-        out_handle.write(struct.pack("<B", self.image.mipmap_count))
-        out_handle.write(struct.pack("<B", self.image.clut_format | (self.image.linear_palette * 0x80)))
-        out_handle.write(struct.pack("<B", self.image.bpp_map_inv[self.image.bpp]))
-        out_handle.write(struct.pack("<H", self.image.width))
-        out_handle.write(struct.pack("<H", self.image.height))
-        out_handle.write(struct.pack("<Q", self.image.gs_tex0))
-        out_handle.write(struct.pack("<Q", self.image.gs_tex1))
-        out_handle.write(struct.pack("<I", self.image.gs_regs))
-        out_handle.write(struct.pack("<I", self.image.gs_tex_clut))
-        out_handle.write(self.image.data)
-        out_handle.write(self.image.palette)
-        return out_handle.getvalue()
+        image = self.image
+
+        header = tim2_header.pack(
+            b"TIM2",
+            self.version,
+            self.num_images,
+            image.total_length,
+            image.palette_length,
+            image.data_length,
+            image.header_length,
+            image.color_entries,
+            image.image_format,
+            image.mipmap_count,
+            image.clut_format | (image.linear_palette * 0x80),
+            image.bpp_map_inv[image.bpp],
+            image.width,
+            image.height,
+            image.gs_tex0,
+            image.gs_tex1,
+            image.gs_regs,
+            image.gs_tex_clut,
+        )
+
+        return b"".join((header, image.data, image.palette))
 
 
 first_row = 60
@@ -251,11 +254,12 @@ idx_num = (
 )
 
 
-def patch_pl_mtop(tim2_eu_io: BinaryIO, tim2_jp_io: BinaryIO):
+def patch_pl_mtop(tim2_eu_io: BinaryIO, tim2_jp_io: "BinaryIO | Tim2Image"):
     tim2img_eu = Tim2Image(tim2_eu_io)
     assert tim2img_eu.image and tim2img_eu.image.data and tim2img_eu.image.palette
 
-    tim2img_jp = Tim2Image(tim2_jp_io)
+    # the same japanese image is used for every european one: it can be given already parsed (it is only read)
+    tim2img_jp = tim2_jp_io if isinstance(tim2_jp_io, Tim2Image) else Tim2Image(tim2_jp_io)
     assert tim2img_jp.image and tim2img_jp.image.data and tim2img_jp.image.palette
 
     indices = []
@@ -263,8 +267,9 @@ def patch_pl_mtop(tim2_eu_io: BinaryIO, tim2_jp_io: BinaryIO):
         r = (first_row + i) * tim2img_eu.image.width
         indices.extend(list(range(r + s, r + s + n + 1)))
 
-    p_eu = list(struct.iter_unpack("<4B", tim2img_eu.image.palette))
-    p_jp = list(struct.iter_unpack("<4B", tim2img_jp.image.palette))
+    # palettes as (colors, 4) arrays, straight over their bytes
+    p_eu = np.frombuffer(tim2img_eu.image.palette, dtype=np.uint8).reshape(-1, 4)
+    p_jp = np.frombuffer(tim2img_jp.image.palette, dtype=np.uint8).reshape(-1, 4)
 
     refilter_map = None
     if not tim2img_eu.image.linear_palette:
@@ -272,33 +277,41 @@ def patch_pl_mtop(tim2_eu_io: BinaryIO, tim2_jp_io: BinaryIO):
     if not tim2img_jp.image.linear_palette:
         p_jp, _ = defilter_palette(p_jp)
 
-    def np_take(pal: list, arr: bytearray):
+    def np_take(pal: np.ndarray, arr: bytearray):
         return np.take(pal, np.frombuffer(arr, dtype=np.uint8), axis=0).astype(np.uint8)
 
     img_eu = np_take(p_eu, tim2img_eu.image.data)
     img_jp = np_take(p_jp, tim2img_jp.image.data)
 
     def unique_colors(img: np.ndarray):
-        return np.unique(img, axis=0)
+        # colors as single big endian u32 values (red first): a plain sort of integers, in the same order as the
+        # rows of 4 bytes
+        colors = np.unique(np.ascontiguousarray(img).view(">u4").ravel())
+        return colors.view(np.uint8).reshape(-1, 4)
 
     img_eu[indices] = img_eu[-1]
-    colors_eu = unique_colors(img_eu)
-    p_eu = colors_eu.tolist()
+    p_eu = unique_colors(img_eu)
+
+    # the nearest eu color of every jp color, for all the indices at once (distances are at most 4 * 255^2)
+    p_eu_arr = p_eu.astype(np.int32)
+    jp_cols = img_jp[indices].astype(np.int32)
+    diffs = p_eu_arr[None, :, :] - jp_cols[:, None, :]
+    dists = np.einsum("ijk,ijk->ij", diffs, diffs)
+    min_c_idxs = dists.argmin(axis=1)
+    min_dists = dists[np.arange(len(indices)), min_c_idxs]
+
+    img_eu[indices] = p_eu_arr[min_c_idxs]
 
     color_errors: dict[tuple, list] = {}
-    for idx in indices:
-        jp_col = img_jp[idx]
-        dists = np.power(p_eu - jp_col, 2).sum(axis=1)
-        min_c_idx = dists.argmin()
-        jp_col_tp = tuple(jp_col.tolist())
+    for idx, jp_col, min_dist in zip(indices, jp_cols.tolist(), min_dists.tolist()):
+        jp_col_tp = tuple(jp_col)
         if jp_col_tp not in color_errors:
             color_errors[jp_col_tp] = [0, []]
-        color_errors[jp_col_tp][0] = dists[min_c_idx]
+        color_errors[jp_col_tp][0] = min_dist
         color_errors[jp_col_tp][1].append(idx)
-        img_eu[idx] = p_eu[min_c_idx]
 
-    assert len(np.unique(img_eu, axis=0)) <= 256
-    assert len(np.unique(img_jp, axis=0)) <= 256
+    assert len(unique_colors(img_eu)) <= 256
+    assert len(unique_colors(img_jp)) <= 256
 
     new_colors = unique_colors(img_eu)
     free_colors = 256 - len(new_colors)
@@ -313,14 +326,17 @@ def patch_pl_mtop(tim2_eu_io: BinaryIO, tim2_jp_io: BinaryIO):
 
     assert len(new_palette_eu) == 256
 
-    @lru_cache(maxsize=None)
-    def to_gray(color):
-        r, g, b = color[:3]
-        return (0.299 * r) + (0.587 * g) + (0.114 * b)
-
-    new_palette_eu = sorted(new_palette_eu.tolist(), key=lambda x: to_gray(tuple(x)))
+    # sorted by gray level, computed for all the colors at once (in double precision, so that ties stay ties)
+    rgb = new_palette_eu[:, :3].astype(np.float64)
+    gray = (0.299 * rgb[:, 0]) + (0.587 * rgb[:, 1]) + (0.114 * rgb[:, 2])
+    new_palette_eu = new_palette_eu[np.argsort(gray, kind="stable")]
 
-    img_eu_palettized = np.where(scipy.spatial.distance.cdist(img_eu, new_palette_eu) == 0)[1].astype(np.uint8)
+    # colors as single u32 values: every pixel is looked up in the (sorted) palette, which has all of its colors once
+    palette_eu_u32 = new_palette_eu.view("<u4").ravel()
+    img_eu_u32 = np.ascontiguousarray(img_eu).view("<u4").ravel()
+    palette_eu_order = np.argsort(palette_eu_u32)
+    img_eu_palettized = palette_eu_order[np.searchsorted(palette_eu_u32, img_eu_u32, sorter=palette_eu_order)]
+    img_eu_palettized = img_eu_palettized.astype(np.uint8)
 
     # refilter palette
     if not tim2img_eu.image.linear_palette:
@@ -329,7 +345,7 @@ def patch_pl_mtop(tim2_eu_io: BinaryIO, tim2_jp_io: BinaryIO):
     or_palette_len = len(tim2img_eu.image.palette)
     or_data_len = len(tim2img_eu.image.data)
 
-    tim2img_eu.image.palette = bytearray(np.array(new_palette_eu, dtype=np.uint8).tobytes())
+    tim2img_eu.image.palette = bytearray(new_palette_eu.tobytes())
     tim2img_eu.image.data = bytearray(img_eu_palettized.tobytes())
 
     assert len(tim2img_eu.image.palette) == or_palette_len
@@ -338,40 +354,49 @@ def patch_pl_mtop(tim2_eu_io: BinaryIO, tim2_jp_io: BinaryIO):
     return tim2img_eu.to_bytes()
 
 
+@lru_cache(maxsize=None)
+def palette_filter_maps(length: int):
+    # for every color of the defiltered palette, where it is in the filtered one (and the other way round): colors
+    # come in blocks of 8, with the second and third block of every 32 colors swapped
+    parts = length // 32
+    stripes = 2
+    colors = 8
+    blocks = 2
+
+    defilter_map = np.arange(parts * 32).reshape(parts, stripes, blocks, colors).transpose(0, 2, 1, 3).ravel()
+    refilter_map = np.argsort(defilter_map)
+
+    # (the maps are shared by every palette of the same length)
+    defilter_map.flags.writeable = False
+    refilter_map.flags.writeable = False
+
+    return defilter_map, refilter_map
+
+
 def refilter_palette(palette, refilter_map=None):
+    palette = np.asarray(palette)
+
     if refilter_map is None:
-        _, refilter_map = defilter_palette(palette)
+        defilter_map, inverse_map = palette_filter_maps(len(palette))
 
-    length = len(palette)
+        if len(defilter_map) == len(palette):
+            return palette[inverse_map]
 
-    new_colors = [0] * length
+        refilter_map = defilter_map
 
-    for i in range(length):
-        new_colors[refilter_map[i]] = palette[i]
+    new_colors = np.zeros_like(palette)
+    new_colors[np.asarray(refilter_map)] = palette
 
     return new_colors
 
 
 def defilter_palette(palette):
-    length = len(palette)
-
-    parts = length // 32
-    stripes = 2
-    colors = 8
-    blocks = 2
-
-    new_colors = [0] * length
+    palette = np.asarray(palette)
 
-    refilter_map: list[int] = []
+    defilter_map, _ = palette_filter_maps(len(palette))
 
-    i = 0
-    for part in range(parts):
-        for block in range(blocks):
-            for stripe in range(stripes):
-                for color in range(colors):
-                    j = (part * colors * stripes * blocks) + (block * colors) + (stripe * stripes * colors) + color
-                    new_colors[i] = palette[j]
-                    refilter_map.append(j)
-                    i += 1
+    # (colors past the last whole part are left as zeros)
+    new_colors = np.zeros_like(palette)
+    new_colors[: len(defilter_map)] = palette[defilter_map]
 
-    return new_colors, refilter_map
+    return new_colors, defilter_map